@@ -7,43 +7,160 @@
 
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext, simpledialog
+import tkinter.font as tkFont
 import json
 import os
+import concurrent.futures
+import hashlib
+import pickle
+import sys
 import re
+import threading
+import queue
+import collections
 import subprocess
 import platform
 import requests
-from datetime import datetime, timedelta
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from datetime import datetime
 import time
 
-# 尝试导入dateutil，如果没有则使用替代方案
+# 可选的 orjson，加速 classes.json 读写
 try:
-    from dateutil.relativedelta import relativedelta
-    HAS_DATEUTIL = True
+    import orjson
+    HAS_ORJSON = True
+    _json_loads = orjson.loads
 except ImportError:
-    HAS_DATEUTIL = False
-    def relativedelta(months=0):
-        """简单的月份偏移替代方案"""
-        return timedelta(days=months * 30)
+    HAS_ORJSON = False
+    _json_loads = json.loads
+
+# 可选的 rapidfuzz，用编辑距离打分替代手写的模糊匹配
+try:
+    from rapidfuzz import fuzz, process as fuzz_process, utils as fuzz_utils
+    HAS_RAPIDFUZZ = True
+except ImportError:
+    HAS_RAPIDFUZZ = False
+
+# 可选的 ijson，流式解析月度存档，不必把整个响应读入内存
+try:
+    import ijson
+    HAS_IJSON = True
+except ImportError:
+    HAS_IJSON = False
+
+# 可选的 requests-cache，把 Chess.com 的响应缓存到本地 SQLite
+try:
+    import requests_cache
+    HAS_REQUESTS_CACHE = True
+except ImportError:
+    HAS_REQUESTS_CACHE = False
+
+# 学员名单: 行首序号 (如 "1." 或 "2)")
+_STUDENT_NUM_RE = re.compile(r'^\d+[\.\)]\s*')
+
+# 对阵表: 行首序号
+_PREFIX_RE = re.compile(r'^\s*\d+[\.\):\-\s]*\s*')
+# 对阵表: 各种对阵格式，按顺序尝试
+_PAIR_RES = tuple(re.compile(p, re.IGNORECASE) for p in (
+    # 标准格式
+    r'(.+?)\s+[vs对战VS]\s+(.+?)(?:\s|$)',
+    r'(.+?)\s+-\s+(.+?)(?:\s|$)',
+    r'(.+?)\s+对\s+(.+?)(?:\s|$)',
+    r'(.+?)\s*[:：]\s*(.+?)(?:\s|$)',
+    # 简单空格分隔
+    r'^(.+?)\s+(.+?)$',
+))
+# 上面各格式合并成一个分支正则，一次 match 即可；分支顺序与逐个尝试时一致。
+# 每个格式都能从行首开始匹配，所以 match 的结果和依次 search 相同
+_PAIR_RE = re.compile(
+    r'(?P<w0>.+?)\s+[vs对战VS]\s+(?P<b0>.+?)(?:\s|$)'
+    r'|(?P<w1>.+?)\s+-\s+(?P<b1>.+?)(?:\s|$)'
+    r'|(?P<w2>.+?)\s+对\s+(?P<b2>.+?)(?:\s|$)'
+    r'|(?P<w3>.+?)\s*[:：]\s*(?P<b3>.+?)(?:\s|$)'
+    r'|^(?P<w4>.+?)\s+(?P<b4>.+?)$',
+    re.IGNORECASE
+)
+# 对阵表: 常见分隔符，先用 str.partition 快速切分，都不命中再走正则
+_PAIR_SEPS = (' vs ', ' VS ', ' - ', ' 对战 ', ' 对 ', '：', ':')
+# 文件名中不允许的字符
+_FILENAME_RE = re.compile(r'[<>:"/\\|?*]')
+# 模糊匹配时去除的空格和标点
+_CLEAN_RE = re.compile(r'[^\w]')
 
 class ChessToolTabs:
+    # 调试时可设为 True，输出带缩进的 classes.json
+    PRETTY_JSON = False
+    # classes.json 的解析缓存
+    CACHE_FILE = "classes.cache.pkl"
+    # 学员表格每次加载的行数
+    TREE_PAGE_SIZE = 100
+    # 并行下载的线程数，以及同时进行的 HTTP 请求上限（避免请求过于频繁）
+    DOWNLOAD_WORKERS = 8
+    MAX_PARALLEL_REQUESTS = 4
+    # 收到 429 时按 Retry-After 退避重试的次数
+    MAX_RATE_LIMIT_RETRIES = 3
+    # Chess.com 响应的本地缓存（需要 requests-cache）
+    HTTP_CACHE_FILE = "chess_cache.sqlite"
+    # 超过这个大小的月度存档才用 ijson 流式解析，其余直接整体解析
+    STREAM_THRESHOLD = 5 << 20
+    
     def __init__(self, root):
         self.root = root
         self.setup_window()
         self.students = {}
+        self._rebuild_student_index()
         self.classes_data = {}
         self.current_class = ""
         self.parsed_pairings = []
+        # 延迟保存：短时间内的多次修改只写一次文件
+        self._dirty = False
+        self._save_pending = False
+        self._last_digest = None
+        self._request_slots = threading.BoundedSemaphore(self.MAX_PARALLEL_REQUESTS)
+        # 复用同一个会话，保持长连接，避免每次请求都重新握手
+        if HAS_REQUESTS_CACHE:
+            # 重复下载时直接命中本地缓存，过期后按 ETag 重新验证
+            self.session = requests_cache.CachedSession(self.HTTP_CACHE_FILE, expire_after=3600,
+                                                        cache_control=True)
+        else:
+            self.session = requests.Session()
+        self.session.headers['User-Agent'] = 'chess_downloader/1.0'
+        # 429 不交给 urllib3 重试，由 _get 按 Retry-After 统一退避
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=32,
+                              max_retries=Retry(total=3, backoff_factor=0.3,
+                                                status_forcelist=[500, 502, 503, 504]))
+        self.session.mount('https://', adapter)
+        # 被限流后所有下载线程都暂停到这个时间点（time.monotonic）
+        self._rate_pause_until = 0.0
+        self._io_pool = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix='chess-io')
+        self._last_log_ts = 0
+        # 进度条批量刷新状态
+        self._pb_accum = 0
+        self._pb_last = 0
+        # 学员表格的延迟加载状态
+        self._tree_rows = []
+        self._tree_loaded = 0
+        self._tree_load_scheduled = False
+        # 班级页当前渲染的班级，用于跳过重复刷新
+        self._last_rendered_class = None
+        self._dirty_view = True
+        # 下载在后台线程运行，进度和日志经队列交给主线程显示
+        self._progress_q = queue.Queue()
+        # 其他线程调用 log 时先放这里，由主线程统一显示
+        self._log_buf = collections.deque()
+        self._download_thread = None
         self.create_widgets()
         self.load_data()
+        self.root.after(100, self._drain_progress)
         
     def setup_window(self):
         """设置窗口"""
         self.root.title("国际象棋教练工具")
         
         # 获取屏幕尺寸
-        screen_width = self.root.winfo_screenwidth()
-        screen_height = self.root.winfo_screenheight()
+        self.screen_width = screen_width = self.root.winfo_screenwidth()
+        self.screen_height = screen_height = self.root.winfo_screenheight()
         
         # 设置窗口尺寸
         window_width = min(1000, int(screen_width * 0.8))
@@ -56,15 +173,21 @@ class ChessToolTabs:
         self.root.geometry(f"{window_width}x{window_height}+{x}+{y}")
         self.root.minsize(800, 600)
         
-        # 字体设置
-        if platform.system() == "Windows":
-            self.font_normal = ("Microsoft YaHei", 10)
-            self.font_button = ("Microsoft YaHei", 11, "bold")
-            self.font_title = ("Microsoft YaHei", 12, "bold")
-        else:
-            self.font_normal = ("Arial", 10)
-            self.font_button = ("Arial", 11, "bold")
-            self.font_title = ("Arial", 12, "bold")
+        # 字体设置 - 注册为 Tk 命名字体，控件按名称引用，字体描述只解析一次
+        family = "Microsoft YaHei" if platform.system() == "Windows" else "Arial"
+        # 保留 Font 对象的引用，否则命名字体会随对象回收被删除
+        self._fonts = (
+            tkFont.Font(root=self.root, name="ChessNormal", family=family, size=10),
+            tkFont.Font(root=self.root, name="ChessButton", family=family, size=11, weight="bold"),
+            tkFont.Font(root=self.root, name="ChessTitle", family=family, size=12, weight="bold"),
+        )
+        self.font_normal, self.font_button, self.font_title = (f.name for f in self._fonts)
+    
+    def _center_on_root(self, dialog, dx=50, dy=50):
+        """把对话框放在主窗口左上角偏移 (dx, dy) 处"""
+        x = self.root.winfo_rootx() + dx
+        y = self.root.winfo_rooty() + dy
+        dialog.geometry(f"+{x}+{y}")
     
     def create_widgets(self):
         """创建界面 - 标签页布局"""
@@ -149,11 +272,11 @@ class ChessToolTabs:
         self.students_tree.column("用户名", width=200)
         
         # 添加滚动条
-        students_scrollbar = ttk.Scrollbar(students_frame, orient="vertical", command=self.students_tree.yview)
-        self.students_tree.configure(yscrollcommand=students_scrollbar.set)
+        self.students_scrollbar = ttk.Scrollbar(students_frame, orient="vertical", command=self.students_tree.yview)
+        self.students_tree.configure(yscrollcommand=self._on_students_scroll)
         
         self.students_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        students_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.students_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         
         # 双击编辑学员
         self.students_tree.bind("<Double-1>", self.edit_student)
@@ -207,10 +330,19 @@ class ChessToolTabs:
         self.result_text = scrolledtext.ScrolledText(
             right_pairing,
             font=self.font_normal,
-            wrap=tk.WORD
+            wrap=tk.WORD,
+            state='disabled'
         )
         self.result_text.pack(fill=tk.BOTH, expand=True)
     
+    def set_result_text(self, text):
+        """一次性替换解析结果（只读文本框，写入时临时解除只读）"""
+        self.result_text.configure(state='normal')
+        self.result_text.delete(1.0, tk.END)
+        if text:
+            self.result_text.insert(1.0, text)
+        self.result_text.configure(state='disabled')
+    
     def create_status_bar(self, parent):
         """创建状态栏"""
         status_frame = ttk.Frame(parent)
@@ -224,29 +356,65 @@ class ChessToolTabs:
         self.progress_bar.pack(side=tk.RIGHT, padx=5)
     
     
+    def reset_progress(self):
+        """进度条归零"""
+        self.progress_bar['value'] = 0
+        self._pb_accum = 0
+        self._pb_last = 0
+    
+    def advance_progress(self, n=1):
+        """进度条前进 n 格；累积后最多每 50ms 刷新一次"""
+        self._pb_accum += n
+        now = time.monotonic()
+        if now - self._pb_last > 0.05:
+            self.progress_bar['value'] += self._pb_accum
+            self._pb_accum = 0
+            self._pb_last = now
+            self.root.update_idletasks()
+    
     def log(self, message):
         """更新状态"""
+        if threading.current_thread() is not threading.main_thread():
+            # Tk 只能在主线程操作，交给 _drain_progress 显示
+            self._log_buf.append(message)
+            return
         if hasattr(self, 'status_var'):
             self.status_var.set(message)
-            self.root.update()
+            # 只刷新界面绘制，且最多约 30 次/秒，避免循环中频繁重绘
+            now = time.monotonic()
+            if now - self._last_log_ts > 0.033:
+                self.root.update_idletasks()
+                self._last_log_ts = now
     
     def load_data(self):
         """加载数据 - 兼容新旧格式"""
         try:
             if os.path.exists("classes.json"):
-                with open("classes.json", "r", encoding="utf-8") as f:
-                    data = json.load(f)
+                st = os.stat("classes.json")
+                cache_key = (st.st_mtime_ns, st.st_size)
+                cached = self._load_cache(cache_key)
                 
-                # 检查数据格式
-                if "classes" in data:
-                    # 新格式
-                    self.classes_data = data["classes"]
-                    self.current_class = data.get("current_class", "")
+                if cached is not None:
+                    # 文件未变化，直接使用上次解析的结果
+                    self.classes_data, self.current_class = cached
+                    self._normalize_classes()
                 else:
-                    # 旧格式：直接是班级字典
-                    self.classes_data = data
-                    if self.classes_data:
-                        self.current_class = list(self.classes_data.keys())[0]
+                    # 直接解析字节，省去文本解码层
+                    with open("classes.json", "rb") as f:
+                        data = _json_loads(f.read())
+                    
+                    # 检查数据格式
+                    if "classes" in data:
+                        # 新格式
+                        self.classes_data = data["classes"]
+                        self.current_class = data.get("current_class", "")
+                    else:
+                        # 旧格式：直接是班级字典
+                        self.classes_data = data
+                        self.current_class = next(iter(self.classes_data), "")
+                    
+                    self._normalize_classes()
+                    self._write_cache(cache_key)
                 
                 self.log("数据加载成功")
             else:
@@ -266,8 +434,42 @@ class ChessToolTabs:
             self.pairing_class_var.set(self.current_class)
             self.on_class_selected()
     
+    def _normalize_classes(self):
+        """加载时统一升级旧格式，之后所有班级都是 {"created_date", "description", "students"}"""
+        for name, info in self.classes_data.items():
+            if not isinstance(info, dict) or "students" not in info:
+                info = {
+                    "created_date": "",
+                    "description": "",
+                    "students": info if isinstance(info, dict) else {}
+                }
+                self.classes_data[name] = info
+            else:
+                info.setdefault("created_date", "")
+                info.setdefault("description", "")
+            # 用户名驻留，相同用户名共用同一个字符串对象
+            info["students"] = {n: sys.intern(u) for n, u in info["students"].items()}
+    
+    def _load_cache(self, cache_key):
+        """读取解析缓存，缓存键为 classes.json 的 (修改时间, 大小)"""
+        try:
+            with open(self.CACHE_FILE, "rb") as f:
+                key, value = pickle.load(f)
+        except Exception:
+            return None
+        return value if key == cache_key else None
+    
+    def _write_cache(self, cache_key):
+        """写入解析缓存，失败时忽略"""
+        try:
+            with open(self.CACHE_FILE, "wb") as f:
+                pickle.dump((cache_key, (self.classes_data, self.current_class)), f, protocol=5)
+        except Exception:
+            pass
+    
     def save_data(self):
         """保存数据"""
+        self._dirty = False
         try:
             data = {
                 "classes": self.classes_data,
@@ -276,15 +478,72 @@ class ChessToolTabs:
                     "round_folder_format": "{class_name}-round{round_number}"
                 }
             }
-            with open("classes.json", "w", encoding="utf-8") as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-            self.log("数据保存成功")
+            if self.PRETTY_JSON:
+                payload = json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+            elif HAS_ORJSON:
+                payload = orjson.dumps(data)
+            else:
+                payload = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode("utf-8")
+            
+            # 内容未变化时不重写文件
+            digest = hashlib.blake2b(payload, digest_size=16).digest()
+            if digest == self._last_digest:
+                return
+            
+            # 序列化在主线程完成，磁盘写入交给后台线程（单线程保证写入顺序）
+            self._last_digest = digest
+            future = self._io_pool.submit(self._write_bytes, payload)
+            self.root.after(50, self._check_write, future)
         except Exception as e:
             self.log(f"保存数据出错: {str(e)}")
     
+    def _write_bytes(self, payload):
+        """后台线程：原子写入 classes.json"""
+        # 先写临时文件再替换，避免写到一半时损坏数据文件
+        tmp_path = "classes.json.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, "classes.json")
+        
+        # 数据文件已变化，旧的解析缓存作废
+        try:
+            os.remove(self.CACHE_FILE)
+        except OSError:
+            pass
+    
+    def _check_write(self, future):
+        """主线程：等待后台写入完成并报告结果"""
+        if not future.done():
+            self.root.after(50, self._check_write, future)
+            return
+        error = future.exception()
+        if error is None:
+            self.log("数据保存成功")
+        else:
+            # 写入失败，下次保存时重试
+            self._last_digest = None
+            self.log(f"保存数据出错: {str(error)}")
+    
+    def _mark_dirty(self):
+        """标记数据已修改，合并短时间内的多次保存"""
+        self._dirty = True
+        # 数据变化后班级页需要重新渲染
+        self._dirty_view = True
+        if not self._save_pending:
+            self._save_pending = True
+            self.root.after(500, self._flush_save)
+    
+    def _flush_save(self):
+        """写入挂起的修改"""
+        self._save_pending = False
+        if self._dirty:
+            self.save_data()
+    
     def update_class_lists(self):
         """更新所有班级列表"""
-        class_names = list(self.classes_data.keys())
+        class_names = tuple(self.classes_data)
         
         # 更新班级管理页的下拉框
         self.class_combo['values'] = class_names
@@ -296,25 +555,20 @@ class ChessToolTabs:
         """班级选择事件 - 班级管理页"""
         class_name = self.class_var.get()
         if class_name and class_name in self.classes_data:
+            # 重复选择同一班级且数据未变化时无需重建表格
+            if class_name == self._last_rendered_class and not self._dirty_view:
+                return
+            
             self.current_class = class_name
             class_info = self.classes_data[class_name]
+            self.students = class_info["students"]
+            self._rebuild_student_index()
             
-            # 获取学员数据
-            if isinstance(class_info, dict):
-                if "students" in class_info:
-                    self.students = class_info["students"]
-                    # 显示班级信息
-                    info_text = f"班级: {class_name}\n"
-                    info_text += f"创建日期: {class_info.get('created_date', '未知')}\n"
-                    info_text += f"描述: {class_info.get('description', '无')}\n"
-                    info_text += f"学员数量: {len(self.students)}"
-                else:
-                    # 旧格式：直接是学员字典
-                    self.students = class_info
-                    info_text = f"班级: {class_name}\n学员数量: {len(self.students)}"
-            else:
-                self.students = {}
-                info_text = f"班级: {class_name}\n数据格式错误"
+            # 显示班级信息
+            info_text = f"班级: {class_name}\n"
+            info_text += f"创建日期: {class_info['created_date'] or '未知'}\n"
+            info_text += f"描述: {class_info['description'] or '无'}\n"
+            info_text += f"学员数量: {len(self.students)}"
             
             # 更新班级信息显示
             self.class_info_text.delete(1.0, tk.END)
@@ -326,6 +580,8 @@ class ChessToolTabs:
             # 同步对阵表页的班级选择
             self.pairing_class_var.set(class_name)
             
+            self._last_rendered_class = class_name
+            self._dirty_view = False
             self.log(f"已选择班级: {class_name}")
     
     def on_pairing_class_selected(self, event=None):
@@ -333,16 +589,10 @@ class ChessToolTabs:
         class_name = self.pairing_class_var.get()
         if class_name and class_name in self.classes_data:
             self.current_class = class_name
-            class_info = self.classes_data[class_name]
-            
-            # 获取学员数据
-            if isinstance(class_info, dict):
-                if "students" in class_info:
-                    self.students = class_info["students"]
-                else:
-                    self.students = class_info
-            else:
-                self.students = {}
+            self.students = self.classes_data[class_name]["students"]
+            self._rebuild_student_index()
+            # 班级管理页显示的可能仍是别的班级，下次在那边选择时必须重新渲染
+            self._dirty_view = True
             
             # 同步班级管理页的选择
             self.class_var.set(class_name)
@@ -350,14 +600,40 @@ class ChessToolTabs:
             self.log(f"对阵表处理班级: {class_name}")
     
     def update_students_tree(self):
-        """更新学员表格"""
-        # 清空现有数据
-        for item in self.students_tree.get_children():
-            self.students_tree.delete(item)
-        
-        # 添加学员数据
-        for real_name, username in self.students.items():
-            self.students_tree.insert("", tk.END, values=(real_name, username))
+        """更新学员表格 - 先显示首屏，其余行随滚动分批加载"""
+        self._tree_rows = list(self.students.items())
+        self._tree_loaded = 0
+        
+        # 一次调用清空现有数据
+        self.students_tree.delete(*self.students_tree.get_children())
+        self._load_more_students()
+    
+    def _load_more_students(self):
+        """向学员表格追加下一批行"""
+        self._tree_load_scheduled = False
+        start = self._tree_loaded
+        rows = self._tree_rows[start:start + self.TREE_PAGE_SIZE]
+        if not rows:
+            return
+        
+        tree = self.students_tree
+        # 批量更新期间暂停选择和滚动条刷新
+        tree.configure(selectmode='none', yscrollcommand='')
+        try:
+            insert = tree.insert
+            for values in rows:
+                insert("", tk.END, values=values)
+        finally:
+            tree.configure(selectmode='extended', yscrollcommand=self._on_students_scroll)
+        self._tree_loaded = start + len(rows)
+    
+    def _on_students_scroll(self, first, last):
+        """滚动条回调；接近底部时加载更多学员"""
+        self.students_scrollbar.set(first, last)
+        if (float(last) >= 0.9 and self._tree_loaded < len(self._tree_rows)
+                and not self._tree_load_scheduled):
+            self._tree_load_scheduled = True
+            self.root.after_idle(self._load_more_students)
     
     def create_class(self):
         """创建新班级"""
@@ -369,7 +645,7 @@ class ChessToolTabs:
         dialog.grab_set()
         
         # 居中显示
-        dialog.geometry("+%d+%d" % (self.root.winfo_rootx() + 50, self.root.winfo_rooty() + 50))
+        self._center_on_root(dialog)
         
         # 班级名称
         ttk.Label(dialog, text="班级名称:", font=self.font_normal).pack(pady=5)
@@ -408,8 +684,9 @@ class ChessToolTabs:
             
             self.current_class = class_name
             self.students = {}
+            self._rebuild_student_index()
             
-            self.save_data()
+            self._mark_dirty()
             self.update_class_lists()
             self.class_var.set(class_name)
             self.pairing_class_var.set(class_name)
@@ -432,23 +709,24 @@ class ChessToolTabs:
         
         result = messagebox.askyesno("确认删除", f"确定要删除班级 '{self.current_class}' 吗？\n此操作不可恢复！")
         if result:
-            del self.classes_data[self.current_class]
+            self.classes_data.pop(self.current_class, None)
             
             # 选择新的当前班级
             if self.classes_data:
-                self.current_class = list(self.classes_data.keys())[0]
+                self.current_class = next(iter(self.classes_data))
                 self.class_var.set(self.current_class)
                 self.pairing_class_var.set(self.current_class)
                 self.on_class_selected()
             else:
                 self.current_class = ""
                 self.students = {}
+                self._rebuild_student_index()
                 self.class_var.set("")
                 self.pairing_class_var.set("")
                 self.class_info_text.delete(1.0, tk.END)
                 self.update_students_tree()
             
-            self.save_data()
+            self._mark_dirty()
             self.update_class_lists()
             self.log("班级已删除")
     
@@ -466,10 +744,9 @@ class ChessToolTabs:
         dialog.grab_set()
         
         # 居中显示
-        dialog.geometry("+%d+%d" % (self.root.winfo_rootx() + 50, self.root.winfo_rooty() + 50))
+        self._center_on_root(dialog)
         
-        class_info = self.classes_data[self.current_class]
-        current_desc = class_info.get('description', '') if isinstance(class_info, dict) else ''
+        current_desc = self.classes_data[self.current_class]['description']
         
         # 班级描述
         ttk.Label(dialog, text="班级描述:", font=self.font_normal).pack(pady=5)
@@ -484,18 +761,9 @@ class ChessToolTabs:
         def save_action():
             desc = desc_text.get(1.0, tk.END).strip()
             
-            if isinstance(self.classes_data[self.current_class], dict):
-                self.classes_data[self.current_class]['description'] = desc
-            else:
-                # 升级旧格式
-                old_students = self.classes_data[self.current_class]
-                self.classes_data[self.current_class] = {
-                    "created_date": datetime.now().strftime("%Y-%m-%d"),
-                    "description": desc,
-                    "students": old_students
-                }
+            self.classes_data[self.current_class]['description'] = desc
             
-            self.save_data()
+            self._mark_dirty()
             self.on_class_selected()  # 刷新显示
             self.log("班级信息已更新")
             dialog.destroy()
@@ -518,7 +786,7 @@ class ChessToolTabs:
         dialog.grab_set()
         
         # 居中显示
-        dialog.geometry("+%d+%d" % (self.root.winfo_rootx() + 100, self.root.winfo_rooty() + 100))
+        self._center_on_root(dialog, 100, 100)
         
         # 真实姓名
         ttk.Label(dialog, text="真实姓名:", font=self.font_normal).pack(pady=5)
@@ -546,14 +814,9 @@ class ChessToolTabs:
                 return
             
             # 添加到当前班级
-            class_info = self.classes_data[self.current_class]
-            if isinstance(class_info, dict) and "students" in class_info:
-                class_info["students"][real_name] = username
-            else:
-                # 兼容旧格式
-                class_info[real_name] = username
+            self.classes_data[self.current_class]["students"][real_name] = sys.intern(username)
             
-            self.save_data()
+            self._mark_dirty()
             self.on_class_selected()  # 刷新显示
             self.log(f"添加学员: {real_name}")
             dialog.destroy()
@@ -578,7 +841,7 @@ class ChessToolTabs:
         dialog.grab_set()
         
         # 居中显示
-        dialog.geometry("+%d+%d" % (self.root.winfo_rootx() + 50, self.root.winfo_rooty() + 50))
+        self._center_on_root(dialog)
         
         # 说明
         help_text = """支持的格式：
@@ -597,12 +860,16 @@ class ChessToolTabs:
         paste_text.pack(fill=tk.BOTH, expand=True)
         paste_text.focus()
         
-        # 尝试粘贴剪贴板内容
-        try:
-            clipboard_content = self.root.clipboard_get()
-            paste_text.insert(1.0, clipboard_content)
-        except:
-            pass
+        # 尝试粘贴剪贴板内容；延后读取，剪贴板所有者响应慢时不阻塞对话框弹出
+        def fill_from_clipboard():
+            try:
+                clipboard_content = self.root.clipboard_get(type='STRING')
+            except tk.TclError:
+                return
+            if clipboard_content and not paste_text.get(1.0, tk.END).strip():
+                paste_text.insert(1.0, clipboard_content)
+        
+        dialog.after(50, fill_from_clipboard)
         
         # 按钮
         btn_frame = ttk.Frame(dialog)
@@ -619,14 +886,9 @@ class ChessToolTabs:
                 
                 if students_data:
                     # 添加到当前班级
-                    class_info = self.classes_data[self.current_class]
-                    if isinstance(class_info, dict) and "students" in class_info:
-                        class_info["students"].update(students_data)
-                    else:
-                        # 兼容旧格式
-                        class_info.update(students_data)
+                    self.classes_data[self.current_class]["students"].update(students_data)
                     
-                    self.save_data()
+                    self._mark_dirty()
                     self.on_class_selected()  # 刷新显示
                     self.log(f"导入 {len(students_data)} 名学员")
                     messagebox.showinfo("成功", f"成功导入 {len(students_data)} 名学员！", parent=dialog)
@@ -660,14 +922,9 @@ class ChessToolTabs:
                 
                 if students_data:
                     # 添加到当前班级
-                    class_info = self.classes_data[self.current_class]
-                    if isinstance(class_info, dict) and "students" in class_info:
-                        class_info["students"].update(students_data)
-                    else:
-                        # 兼容旧格式
-                        class_info.update(students_data)
+                    self.classes_data[self.current_class]["students"].update(students_data)
                     
-                    self.save_data()
+                    self._mark_dirty()
                     self.on_class_selected()  # 刷新显示
                     self.log(f"从文件导入 {len(students_data)} 名学员")
                     messagebox.showinfo("成功", f"成功导入 {len(students_data)} 名学员！")
@@ -695,16 +952,9 @@ class ChessToolTabs:
         result = messagebox.askyesno("确认删除", f"确定要删除学员 '{real_name}' 吗？")
         if result:
             # 从当前班级删除
-            class_info = self.classes_data[self.current_class]
-            if isinstance(class_info, dict) and "students" in class_info:
-                if real_name in class_info["students"]:
-                    del class_info["students"][real_name]
-            else:
-                # 兼容旧格式
-                if real_name in class_info:
-                    del class_info[real_name]
+            self.classes_data[self.current_class]["students"].pop(real_name, None)
             
-            self.save_data()
+            self._mark_dirty()
             self.on_class_selected()  # 刷新显示
             self.log(f"删除学员: {real_name}")
     
@@ -730,7 +980,7 @@ class ChessToolTabs:
         dialog.grab_set()
         
         # 居中显示
-        dialog.geometry("+%d+%d" % (self.root.winfo_rootx() + 100, self.root.winfo_rooty() + 100))
+        self._center_on_root(dialog, 100, 100)
         
         # 真实姓名
         ttk.Label(dialog, text="真实姓名:", font=self.font_normal).pack(pady=5)
@@ -759,20 +1009,13 @@ class ChessToolTabs:
                 return
             
             # 更新学员信息
-            class_info = self.classes_data[self.current_class]
-            if isinstance(class_info, dict) and "students" in class_info:
-                # 删除旧记录
-                if old_name in class_info["students"]:
-                    del class_info["students"][old_name]
-                # 添加新记录
-                class_info["students"][new_name] = new_username
-            else:
-                # 兼容旧格式
-                if old_name in class_info:
-                    del class_info[old_name]
-                class_info[new_name] = new_username
+            students = self.classes_data[self.current_class]["students"]
+            # 删除旧记录
+            students.pop(old_name, None)
+            # 添加新记录
+            students[new_name] = sys.intern(new_username)
             
-            self.save_data()
+            self._mark_dirty()
             self.on_class_selected()  # 刷新显示
             self.log(f"更新学员: {new_name}")
             dialog.destroy()
@@ -784,33 +1027,30 @@ class ChessToolTabs:
         dialog.bind('<Return>', lambda e: save_action())
     
     def parse_students_list(self, content):
-        """解析学员名单"""
+        """解析学员名单 - 每行 "姓名 -> 用户名" 或 "姓名 用户名"，只有一个词时姓名即用户名"""
         students = {}
-        lines = content.strip().split('\n')
-        
-        for line in lines:
+        intern = sys.intern
+        for line in content.split('\n'):
             line = line.strip()
             if not line:
                 continue
             
-            # 移除序号
-            line = re.sub(r'^\d+[\.\)]\s*', '', line)
+            # 移除序号；只有以数字开头的行才需要跑正则
+            if line[0].isdigit():
+                line = _STUDENT_NUM_RE.sub('', line, count=1)
             
-            # 解析格式
-            if '->' in line:
-                parts = line.split('->')
-                if len(parts) == 2:
-                    real_name = parts[0].strip()
-                    username = parts[1].strip()
-                    students[real_name] = username
-            else:
-                parts = line.split()
-                if len(parts) >= 2:
-                    real_name = ' '.join(parts[:-1])
-                    username = parts[-1]
-                    students[real_name] = username
-                elif len(parts) == 1:
-                    students[parts[0]] = parts[0]
+            # 用 partition 代替 split('->')，恰好一个 "->" 时才接受
+            real_name, sep, username = line.partition('->')
+            if sep:
+                if '->' not in username:
+                    students[real_name.strip()] = intern(username.strip())
+                continue
+            
+            parts = line.split()
+            if len(parts) >= 2:
+                students[' '.join(parts[:-1])] = intern(parts[-1])
+            elif parts:
+                students[parts[0]] = intern(parts[0])
         
         return students
     
@@ -822,13 +1062,13 @@ class ChessToolTabs:
             self.pairings_text.delete(1.0, tk.END)
             self.pairings_text.insert(1.0, clipboard_content)
             self.log("已粘贴对阵表")
-        except:
+        except tk.TclError:
             messagebox.showwarning("警告", "剪贴板无内容！")
     
     def clear_pairings(self):
         """清空对阵表"""
         self.pairings_text.delete(1.0, tk.END)
-        self.result_text.delete(1.0, tk.END)
+        self.set_result_text("")
         self.parsed_pairings = []
         self.progress_bar['value'] = 0
         self.log("已清空对阵表")
@@ -845,31 +1085,33 @@ class ChessToolTabs:
             return
         
         try:
-            self.parsed_pairings = self.parse_pairings_content(content)
-            
-            # 显示结果
-            self.result_text.delete(1.0, tk.END)
-            result = "解析结果:\n" + "="*50 + "\n\n"
+            # 解析、统计和生成结果文本在同一遍循环里完成
+            pairings = []
+            matched = 0
+            parts = ["解析结果:\n", "=" * 50, "\n\n"]
             
-            for i, pairing in enumerate(self.parsed_pairings, 1):
+            for i, pairing in enumerate(self._iter_pairings(content), 1):
+                pairings.append(pairing)
                 white = pairing.get('white', '未知')
                 black = pairing.get('black', '未知')
                 white_user = pairing.get('white_username', '未找到')
                 black_user = pairing.get('black_username', '未找到')
                 
-                status = "✓" if white_user != "未找到" and black_user != "未找到" else "✗"
+                ok = white_user != "未找到" and black_user != "未找到"
+                matched += ok
+                status = "✓" if ok else "✗"
                 
-                result += f"{status} 第{i}局:\n"
-                result += f"   白方: {white} → {white_user}\n"
-                result += f"   黑方: {black} → {black_user}\n"
-                result += "-" * 40 + "\n"
+                parts.append(f"{status} 第{i}局:\n"
+                             f"   白方: {white} → {white_user}\n"
+                             f"   黑方: {black} → {black_user}\n")
+                parts.append("-" * 40 + "\n")
             
-            matched = sum(1 for p in self.parsed_pairings 
-                         if p.get('white_username') != '未找到' and p.get('black_username') != '未找到')
+            self.parsed_pairings = pairings
             
-            result += f"\n统计: 总共{len(self.parsed_pairings)}局，成功匹配{matched}局"
+            # 显示结果
+            parts.append(f"\n统计: 总共{len(self.parsed_pairings)}局，成功匹配{matched}局")
             
-            self.result_text.insert(1.0, result)
+            self.set_result_text(''.join(parts))
             self.log(f"解析完成: {len(self.parsed_pairings)}局，匹配{matched}局")
             
         except Exception as e:
@@ -878,104 +1120,188 @@ class ChessToolTabs:
     
     def parse_pairings_content(self, content):
         """解析对阵内容"""
-        pairings = []
-        lines = content.strip().split('\n')
-        
-        for line in lines:
+        return list(self._iter_pairings(content))
+    
+    def _iter_pairings(self, content):
+        """逐行解析对阵内容，依次产出每一局"""
+        pairs = [pair for pair in map(self._extract_names, self._iter_pairing_lines(content)) if pair]
+        # 先对全部名字批量做一次模糊匹配，后面的 find_username 直接取结果
+        if HAS_RAPIDFUZZ:
+            self._prime_fuzzy_matches([name for pair in pairs for name in pair])
+        for white_name, black_name in pairs:
+            yield self._make_pairing(white_name, black_name)
+    
+    @staticmethod
+    def _iter_pairing_lines(content):
+        """产出去掉序号后的非空对阵行"""
+        for line in content.splitlines():
             line = line.strip()
             if not line:
                 continue
             
             # 更强力的序号移除 - 处理各种序号格式
             # 匹配: 数字 + 可选符号 + 空格
-            line = re.sub(r'^\s*\d+[\.\):\-\s]*\s*', '', line)
+            line = _PREFIX_RE.sub('', line)
             line = line.strip()
             
             if not line:
                 continue
             
-            pairing = self.extract_pairing(line)
-            if pairing:
-                pairings.append(pairing)
-        
-        return pairings
+            yield line
     
     def extract_pairing(self, line):
         """提取对阵 - 增强版"""
-        # 更多对阵格式的正则表达式
-        patterns = [
-            # 标准格式
-            r'(.+?)\s+[vs对战VS]\s+(.+?)(?:\s|$)',
-            r'(.+?)\s+-\s+(.+?)(?:\s|$)', 
-            r'(.+?)\s+对\s+(.+?)(?:\s|$)',
-            r'(.+?)\s*[:：]\s*(.+?)(?:\s|$)',
-            # 简单空格分隔
-            r'^(.+?)\s+(.+?)$',
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, line, re.IGNORECASE)
-            if match:
-                white_name = match.group(1).strip()
-                black_name = match.group(2).strip()
-                
-                # 验证名字不为空且不是纯数字
-                if white_name and black_name and not white_name.isdigit() and not black_name.isdigit():
-                    return {
-                        'white': white_name,
-                        'black': black_name,
-                        'white_username': self.find_username(white_name),
-                        'black_username': self.find_username(black_name)
-                    }
+        names = self._extract_names(line)
+        return self._make_pairing(*names) if names else None
+    
+    def _make_pairing(self, white_name, black_name):
+        """由双方姓名生成对阵记录"""
+        return {
+            'white': white_name,
+            'black': black_name,
+            'white_username': self.find_username(white_name),
+            'black_username': self.find_username(black_name)
+        }
+    
+    def _extract_names(self, line):
+        """从一行中提取 (白方, 黑方) 姓名，无法识别时返回 None"""
+        for white_name, black_name in self._iter_pair_candidates(line):
+            white_name = white_name.strip()
+            black_name = black_name.strip()
+            
+            # 验证名字不为空且不是纯数字
+            if white_name and black_name and not white_name.isdigit() and not black_name.isdigit():
+                return white_name, black_name
         
         return None
     
+    @staticmethod
+    def _iter_pair_candidates(line):
+        """按优先级产出 (白方, 黑方) 候选，调用方取第一个验证通过的"""
+        # 快速路径: "甲 vs 乙"、"甲 - 乙" 等常见格式，用不到正则
+        for sep in _PAIR_SEPS:
+            white_name, found, black_name = line.partition(sep)
+            if found:
+                yield white_name, black_name
+        
+        match = _PAIR_RE.match(line)
+        if not match:
+            return
+        # lastgroup 形如 "b2"，即命中的格式序号
+        k = int(match.lastgroup[1:])
+        yield match[f'w{k}'], match[f'b{k}']
+        # 验证不通过时再按顺序尝试后面的格式
+        for pattern in _PAIR_RES[k + 1:]:
+            match = pattern.search(line)
+            if match:
+                yield match.group(1), match.group(2)
+    
+    def _rebuild_student_index(self):
+        """为 find_username 预先计算各级匹配所需的索引（每次 self.students 变化后调用）"""
+        # 名单变化后清空 find_username 的结果缓存
+        self._find_cache = {}
+        self._students_lc = {}  # 小写姓名 -> 用户名
+        self._first = {}
+        self._tok = {}
+        self._lc_items = []
+        self._clean_items = []
+        self._usernames = []
+        self._name_list = list(self.students)
+        # _prime_fuzzy_matches 批量算出的模糊匹配结果
+        self._fuzzy_hits = {}
+        for idx, (real_name, username) in enumerate(self.students.items()):
+            real_lower = real_name.lower()
+            real_first = real_name.split()[0].lower() if real_name.split() else real_lower
+            # 与逐个扫描时一致：多个学员命中同一键时取排在前面的
+            self._students_lc.setdefault(real_lower, username)
+            self._first.setdefault(real_first, username)
+            for part in real_name.split():
+                if len(part) > 1:
+                    self._tok.setdefault(part.lower(), idx)
+            self._lc_items.append((real_lower, username))
+            self._clean_items.append((_CLEAN_RE.sub('', real_lower), username))
+            self._usernames.append(username)
+    
+    def _prime_fuzzy_matches(self, names):
+        """用一次 rapidfuzz cdist 批量计算需要模糊匹配的名字（多核并行）"""
+        queries = []
+        for name in names:
+            name = name.strip()
+            if (name and name not in self.students and name.lower() not in self._students_lc
+                    and name not in self._fuzzy_hits):
+                queries.append(name)
+        queries = list(dict.fromkeys(queries))
+        if not queries or not self._name_list:
+            return
+        try:
+            scores = fuzz_process.cdist(queries, self._name_list, scorer=fuzz.WRatio,
+                                        processor=fuzz_utils.default_process,
+                                        score_cutoff=85, workers=-1)
+        except ImportError:
+            # cdist 需要 numpy，没有时仍逐个调用 extractOne
+            return
+        for name, row in zip(queries, scores):
+            best = int(row.argmax())
+            self._fuzzy_hits[name] = self.students[self._name_list[best]] if row[best] else "未找到"
+    
     def find_username(self, name):
-        """查找用户名 - 增强匹配算法"""
+        """查找用户名 - 增强匹配算法（同一名单下结果带缓存）"""
+        username = self._find_cache.get(name)
+        if username is None:
+            username = self._find_cache[name] = self._match_username(name)
+        return username
+    
+    def _match_username(self, name):
+        """find_username 的实际匹配逻辑"""
         if not name or not self.students:
             return "未找到"
         
         name = name.strip()
+        lower = name.lower()
         
         # 1. 精确匹配
         if name in self.students:
             return self.students[name]
         
         # 2. 忽略大小写精确匹配
-        for real_name, username in self.students.items():
-            if real_name.lower() == name.lower():
-                return username
+        username = self._students_lc.get(lower)
+        if username is not None:
+            return username
+        
+        # 3-7. 有 rapidfuzz 时直接用 WRatio 打分取最佳
+        if HAS_RAPIDFUZZ:
+            if name in self._fuzzy_hits:
+                return self._fuzzy_hits[name]
+            hit = fuzz_process.extractOne(name, self._name_list, scorer=fuzz.WRatio,
+                                          processor=fuzz_utils.default_process, score_cutoff=85)
+            return self.students[hit[0]] if hit else "未找到"
         
         # 3. 部分匹配 - 输入名字包含在真实姓名中
-        for real_name, username in self.students.items():
-            if name.lower() in real_name.lower():
+        for real_lower, username in self._lc_items:
+            if lower in real_lower:
                 return username
         
         # 4. 部分匹配 - 真实姓名包含在输入名字中  
-        for real_name, username in self.students.items():
-            if real_name.lower() in name.lower():
+        for real_lower, username in self._lc_items:
+            if real_lower in lower:
                 return username
         
         # 5. 首字匹配 - 处理简称（如"Li"匹配"Li Xing"）
-        name_first = name.split()[0].lower() if name.split() else name.lower()
-        for real_name, username in self.students.items():
-            real_first = real_name.split()[0].lower() if real_name.split() else real_name.lower()
-            if name_first == real_first and len(name_first) > 1:
+        parts = name.split()
+        name_first = parts[0].lower() if parts else lower
+        if len(name_first) > 1:
+            username = self._first.get(name_first)
+            if username is not None:
                 return username
         
-        # 6. 姓氏匹配 - 检查所有单词
-        name_parts = [part.lower() for part in name.split() if len(part) > 1]
-        for real_name, username in self.students.items():
-            real_parts = [part.lower() for part in real_name.split() if len(part) > 1]
-            for name_part in name_parts:
-                for real_part in real_parts:
-                    if name_part == real_part:
-                        return username
+        # 6. 姓氏匹配 - 检查所有单词，取最靠前的命中学员
+        hits = [self._tok[p] for p in (part.lower() for part in parts if len(part) > 1) if p in self._tok]
+        if hits:
+            return self._usernames[min(hits)]
         
         # 7. 模糊匹配 - 去除空格和标点
-        clean_name = re.sub(r'[^\w]', '', name.lower())
-        for real_name, username in self.students.items():
-            clean_real = re.sub(r'[^\w]', '', real_name.lower())
+        clean_name = _CLEAN_RE.sub('', lower)
+        for clean_real, username in self._clean_items:
             if clean_name == clean_real:
                 return username
             # 包含匹配
@@ -991,66 +1317,136 @@ class ChessToolTabs:
             messagebox.showwarning("警告", "请先解析对阵表！")
             return
         
+        if self._download_thread is not None and self._download_thread.is_alive():
+            messagebox.showwarning("警告", "正在下载中，请等待当前任务完成！")
+            return
+        
         # 创建下载文件夹
         folder = f"downloads_{self.current_class}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
         os.makedirs(folder, exist_ok=True)
         
-        total = len(self.parsed_pairings)
-        self.progress_bar['maximum'] = total
-        success = 0
-        failed_pairings = []
-        
+        # 收集需要下载的玩家，同一玩家在多局中出现也只下载一次
+        # Chess.com 用户名不区分大小写，按小写去重
+        players = {}       # 小写用户名 -> (用户名, 显示名)
+        player_games = {}  # 小写用户名 -> 该玩家参与的对阵序号
         for i, pairing in enumerate(self.parsed_pairings):
             white_user = pairing['white_username']
             black_user = pairing['black_username']
-            white_name = pairing['white']
-            black_name = pairing['black']
-            
             if white_user == "未找到" or black_user == "未找到":
-                failed_pairings.append(f"第{i+1}局: {white_name} vs {black_name} (用户名未找到)")
                 continue
+            for name, user in ((pairing['white'], white_user), (pairing['black'], black_user)):
+                key = user.lower()
+                players.setdefault(key, (user, f"{name}({user})"))
+                player_games.setdefault(key, []).append(i)
+        
+        self.progress_bar['maximum'] = max(len(players), 1)
+        self.reset_progress()
+        self.log(f"开始并行下载 {len(players)} 名玩家的棋谱...")
+        
+        self._download_thread = threading.Thread(
+            target=self._run_download,
+            args=(folder, players, player_games, list(self.parsed_pairings), self.current_class),
+            name='chess-download', daemon=True)
+        self._download_thread.start()
+    
+    def _run_download(self, folder, players, player_games, pairings, class_name):
+        """后台线程：下载全部棋谱并写报告，不直接操作 Tk"""
+        post = self._progress_q.put
+        log = lambda message: post(('log', message))
+        try:
+            total = len(pairings)
+            success = 0
+            failed_pairings = []
+            results = {}
             
-            self.progress_bar['value'] = i + 1
-            self.log(f"下载第{i+1}/{total}局: {white_name} vs {black_name}")
-            self.root.update()
+            with concurrent.futures.ThreadPoolExecutor(max_workers=self.DOWNLOAD_WORKERS,
+                                                       thread_name_prefix='chess-dl') as ex:
+                futures = {ex.submit(self.download_player_games, user, folder, display_name, log): key
+                           for key, (user, display_name) in players.items()}
+                for future in concurrent.futures.as_completed(futures):
+                    key = futures[future]
+                    try:
+                        results[key] = future.result()
+                    except Exception as e:
+                        log(f"✗ 下载 {players[key][1]} 出错: {str(e)}")
+                        results[key] = False
+                    post(('progress', 1))
             
-            try:
-                # 下载两个玩家的所有棋谱
-                white_success = self.download_player_games(white_user, folder, f"{white_name}({white_user})")
-                black_success = self.download_player_games(black_user, folder, f"{black_name}({black_user})")
+            # 把每名玩家的结果对应回其参与的各局对阵
+            succeeded = set()
+            for key, indices in player_games.items():
+                if results.get(key):
+                    succeeded.update(indices)
+            
+            for i, pairing in enumerate(pairings):
+                white_user = pairing['white_username']
+                black_user = pairing['black_username']
+                white_name = pairing['white']
+                black_name = pairing['black']
                 
-                if white_success or black_success:
+                if white_user == "未找到" or black_user == "未找到":
+                    failed_pairings.append(f"第{i+1}局: {white_name} vs {black_name} (用户名未找到)")
+                elif i in succeeded:
                     success += 1
                 else:
                     failed_pairings.append(f"第{i+1}局: {white_name} vs {black_name} (下载失败)")
-                
-            except Exception as e:
-                self.log(f"下载第{i+1}局出错: {str(e)}")
-                failed_pairings.append(f"第{i+1}局: {white_name} vs {black_name} (错误: {str(e)})")
-        
-        self.progress_bar['value'] = total
-        
-        # 创建下载报告
-        report_file = os.path.join(folder, "下载报告.txt")
-        with open(report_file, "w", encoding="utf-8") as f:
-            f.write(f"下载报告 - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-            f.write("=" * 50 + "\n\n")
-            f.write(f"班级: {self.current_class}\n")
-            f.write(f"总对阵数: {total}\n")
-            f.write(f"成功下载: {success}\n")
-            f.write(f"失败数: {len(failed_pairings)}\n\n")
             
+            # 创建下载报告
+            report_file = os.path.join(folder, "下载报告.txt")
+            report = [f"下载报告 - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n",
+                      "=" * 50 + "\n\n",
+                      f"班级: {class_name}\n",
+                      f"总对阵数: {total}\n",
+                      f"成功下载: {success}\n",
+                      f"失败数: {len(failed_pairings)}\n\n"]
             if failed_pairings:
-                f.write("失败详情:\n")
-                for failure in failed_pairings:
-                    f.write(f"- {failure}\n")
-        
+                report.append("失败详情:\n")
+                report.extend(f"- {failure}\n" for failure in failed_pairings)
+            with open(report_file, "w", encoding="utf-8") as f:
+                f.write(''.join(report))
+            
+            post(('done', (folder, total, success, len(failed_pairings))))
+        except Exception as e:
+            post(('error', str(e)))
+    
+    def _drain_progress(self):
+        """主线程定时取出下载线程发来的进度和日志"""
+        # 状态栏只显示最新一条，一批日志只刷新一次
+        latest = None
+        try:
+            while self._log_buf:
+                latest = self._log_buf.popleft()
+            while True:
+                kind, value = self._progress_q.get_nowait()
+                if kind == 'log':
+                    latest = value
+                elif kind == 'progress':
+                    self.advance_progress(value)
+                elif kind in ('done', 'error'):
+                    if latest is not None:
+                        self.log(latest)
+                        latest = None
+                    if kind == 'done':
+                        self._finish_download(*value)
+                    else:
+                        self.log(f"下载出错: {value}")
+                        messagebox.showerror("错误", f"下载失败: {value}")
+        except queue.Empty:
+            pass
+        finally:
+            if latest is not None:
+                self.log(latest)
+            self.root.after(100, self._drain_progress)
+    
+    def _finish_download(self, folder, total, success, failed):
+        """下载结束后的提示（主线程）"""
+        self.progress_bar['value'] = self.progress_bar['maximum']
         self.log(f"下载完成: 成功{success}/{total}局")
         
         result_message = (f"下载完成!\n"
                          f"总计: {total} 局\n"
                          f"成功: {success} 局\n"
-                         f"失败: {len(failed_pairings)} 局\n"
+                         f"失败: {failed} 局\n"
                          f"保存到: {folder}")
         
         messagebox.showinfo("下载完成", result_message)
@@ -1066,121 +1462,164 @@ class ChessToolTabs:
         except:
             pass
     
-    def download_player_games(self, username, folder, display_name):
-        """下载单个玩家的棋谱"""
+    def download_player_games(self, username, folder, display_name, log=None):
+        """下载单个玩家的棋谱（可在工作线程中运行，日志通过 log 回调输出）"""
+        log = log or self.log
         try:
-            self.log(f"开始下载 {display_name} 的棋谱...")
+            log(f"开始下载 {display_name} 的棋谱...")
             
             # 验证用户名
             if not username or username == "未找到":
-                self.log(f"✗ {display_name} 用户名无效")
+                log(f"✗ {display_name} 用户名无效")
                 return False
             
-            # Chess.com API 获取玩家信息（先验证用户是否存在）
-            player_url = f"https://api.chess.com/pub/player/{username}"
+            # Chess.com API 获取玩家实际有棋局的月份列表（同时验证用户是否存在）
+            index_url = f"https://api.chess.com/pub/player/{username}/games/archives"
+            # 存档列表在新月份开始时会变化，只短时间缓存，避免新月份一小时内都看不到
+            index_kwargs = {'expire_after': 60} if HAS_REQUESTS_CACHE else {}
             try:
-                player_response = requests.get(player_url, timeout=10)
-                if player_response.status_code != 200:
-                    self.log(f"✗ 用户 {username} 不存在或无法访问")
+                index_response = self._get(index_url, timeout=10, **index_kwargs)
+                if index_response.status_code != 200:
+                    log(f"✗ 用户 {username} 不存在或无法访问")
                     return False
+                archives = _json_loads(index_response.content).get('archives', [])
             except requests.RequestException as e:
-                self.log(f"✗ 验证用户 {username} 时网络错误: {str(e)}")
+                log(f"✗ 验证用户 {username} 时网络错误: {str(e)}")
+                return False
+            except ValueError:
+                log(f"✗ 无法解析 {username} 的棋谱存档列表")
                 return False
             
             current_date = datetime.now()
             downloaded_any = False
             
-            # 尝试下载最近几个月的游戏
-            for months_back in range(6):  # 增加到6个月
-                # 计算日期
-                if HAS_DATEUTIL:
-                    archive_date = current_date - relativedelta(months=months_back)
-                else:
-                    # 简单的月份计算
-                    year = current_date.year
-                    month = current_date.month - months_back
-                    while month <= 0:
-                        month += 12
-                        year -= 1
-                    archive_date = datetime(year, month, 1)
-                
-                year = archive_date.year
-                month = archive_date.month
+            # 最近几个月的 "YYYY/MM"，只请求存档列表里真正存在的月份
+            # 月份序号 = 年*12 + (月-1)，往前推几个月只需整数减法
+            now_idx = current_date.year * 12 + (current_date.month - 1)
+            desired = tuple(f"{(now_idx - k) // 12}/{(now_idx - k) % 12 + 1:02d}"
+                            for k in range(6))  # 增加到6个月
+            
+            # 存档列表按时间升序，倒序遍历保持从最近月份开始下载
+            for archive_url in reversed(archives):
+                if not archive_url.endswith(desired):
+                    continue
+                year, month = map(int, archive_url.rsplit('/', 2)[-2:])
                 
-                archive_url = f"https://api.chess.com/pub/player/{username}/games/{year}/{month:02d}"
+                # 已结束的月份不会再变，缓存永久有效；当月只缓存一分钟
+                cache_kwargs = {}
+                if HAS_REQUESTS_CACHE:
+                    is_current = (year, month) == (current_date.year, current_date.month)
+                    cache_kwargs['expire_after'] = 60 if is_current else requests_cache.NEVER_EXPIRE
                 
                 try:
-                    self.log(f"  正在检查 {year}-{month:02d}...")
-                    response = requests.get(archive_url, timeout=15)
-                    
-                    if response.status_code == 200:
-                        games_data = response.json()
-                        games = games_data.get('games', [])
-                        
-                        if games:
+                    log(f"  正在检查 {year}-{month:02d}...")
+                    # requests-cache 存储响应时会读完整个正文，开启缓存时流式读取没有意义
+                    with self._get(archive_url, stream=not HAS_REQUESTS_CACHE, **cache_kwargs) as response:
+                        if response.status_code == 200:
                             # 保存为PGN文件
                             filename = f"{display_name}_{year}_{month:02d}.pgn"
                             # 清理文件名中的特殊字符
-                            filename = re.sub(r'[<>:"/\\|?*]', '_', filename)
+                            filename = _FILENAME_RE.sub('_', filename)
                             filepath = os.path.join(folder, filename)
                             
-                            with open(filepath, "w", encoding="utf-8") as f:
-                                f.write(f"# {display_name} 的棋谱 - {year}年{month}月\n")
-                                f.write(f"# 下载时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-                                f.write(f"# 总共 {len(games)} 局游戏\n")
-                                f.write(f"# Chess.com用户名: {username}\n\n")
-                                
-                                game_count = 0
-                                for idx, game in enumerate(games, 1):
-                                    pgn = game.get('pgn', '')
+                            # 边解析边写入，收到第一局时才创建文件
+                            f = None
+                            game_count = 0
+                            total_games = 0
+                            # 整体解析时总局数已知，照常写在文件头；只有流式解析才写在文件末尾
+                            known_total, pgns = self._archive_pgns(response)
+                            total_line = "" if known_total is None else f"# 总共 {known_total} 局游戏\n"
+                            try:
+                                for idx, pgn in enumerate(pgns, 1):
+                                    total_games = idx
+                                    if f is None:
+                                        # 二进制大缓冲写入，省去文本层的逐次编码
+                                        f = open(filepath, "wb", buffering=1 << 20)
+                                        f.write((f"# {display_name} 的棋谱 - {year}年{month}月\n"
+                                                 f"# 下载时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
+                                                 f"{total_line}"
+                                                 f"# Chess.com用户名: {username}\n\n").encode('utf-8'))
                                     if pgn:
-                                        f.write(f"[Event \"Chess.com - Game #{idx}\"]\n")
-                                        f.write(pgn)
-                                        if not pgn.endswith('\n'):
-                                            f.write('\n')
-                                        f.write('\n')
+                                        tail = '\n' if pgn.endswith('\n') else '\n\n'
+                                        f.write(f"[Event \"Chess.com - Game #{idx}\"]\n{pgn}{tail}".encode('utf-8'))
                                         game_count += 1
+                                if f is not None and known_total is None:
+                                    # 流式写入时事先不知道总局数，写在文件末尾
+                                    f.write(f"# 总共 {total_games} 局游戏\n".encode('utf-8'))
+                            finally:
+                                if f is not None:
+                                    f.close()
                             
-                            self.log(f"  ✓ 已保存 {game_count} 局棋谱 ({year}-{month:02d})")
-                            downloaded_any = True
-                    
-                    elif response.status_code == 404:
-                        # 该月份没有游戏记录，这是正常的
-                        pass
-                    else:
-                        self.log(f"  ! HTTP错误 {response.status_code} - {year}-{month:02d}")
-                    
-                    # 避免请求过于频繁
-                    time.sleep(0.3)
+                            if f is not None:
+                                log(f"  ✓ 已保存 {game_count} 局棋谱 ({year}-{month:02d})")
+                                downloaded_any = True
+                        
+                        else:
+                            log(f"  ! HTTP错误 {response.status_code} - {year}-{month:02d}")
                     
                 except requests.Timeout:
-                    self.log(f"  ! 请求超时 - {year}-{month:02d}")
+                    log(f"  ! 请求超时 - {year}-{month:02d}")
                     continue
                 except requests.RequestException as e:
-                    self.log(f"  ! 网络错误 - {year}-{month:02d}: {str(e)}")
+                    log(f"  ! 网络错误 - {year}-{month:02d}: {str(e)}")
                     continue
                 except Exception as e:
-                    self.log(f"  ! 处理错误 - {year}-{month:02d}: {str(e)}")
+                    log(f"  ! 处理错误 - {year}-{month:02d}: {str(e)}")
                     continue
             
             if downloaded_any:
-                self.log(f"✓ {display_name} 下载完成")
+                log(f"✓ {display_name} 下载完成")
             else:
-                self.log(f"✗ {display_name} 未找到任何游戏记录")
+                log(f"✗ {display_name} 未找到任何游戏记录")
             
             return downloaded_any
             
         except Exception as e:
-            self.log(f"✗ 下载 {display_name} 失败: {str(e)}")
+            log(f"✗ 下载 {display_name} 失败: {str(e)}")
             return False
 
+    def _get(self, url, **kwargs):
+        """GET 请求：只在收到 429 时按 Retry-After 暂停全部请求再重试"""
+        kwargs.setdefault('timeout', 15)
+        for attempt in range(self.MAX_RATE_LIMIT_RETRIES + 1):
+            wait = self._rate_pause_until - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            with self._request_slots:
+                response = self.session.get(url, **kwargs)
+            if response.status_code != 429 or attempt == self.MAX_RATE_LIMIT_RETRIES:
+                return response
+            response.close()
+            try:
+                delay = float(response.headers.get('Retry-After', 1))
+            except ValueError:
+                delay = 1.0
+            self._rate_pause_until = max(self._rate_pause_until, time.monotonic() + delay)
+        return response
+    
+    @classmethod
+    def _archive_pgns(cls, response):
+        """返回 (总局数, 逐局 PGN 文本)（一般用 orjson 整体解析，特别大的存档用 ijson 流式解析）
+
+        流式解析时事先不知道总局数，返回 None；开启 requests-cache 时正文已整体读入内存，直接整体解析
+        """
+        size = int(response.headers.get('Content-Length') or 0)
+        if HAS_IJSON and not HAS_REQUESTS_CACHE and (not HAS_ORJSON or size > cls.STREAM_THRESHOLD):
+            response.raw.decode_content = True
+            return None, (game.get('pgn', '') for game in ijson.items(response.raw, 'games.item'))
+        games = _json_loads(response.content).get('games', [])
+        return len(games), (game.get('pgn', '') for game in games)
+
 def main():
     root = tk.Tk()
     app = ChessToolTabs(root)
     
     def on_closing():
         try:
+            # 直接保存，顺带写入尚未落盘的延迟修改
             app.save_data()
+            # 等待后台写入完成再退出
+            app._io_pool.shutdown(wait=True)
         except:
             pass
         root.destroy()
@@ -7,68 +7,265 @@
 
 from __future__ import annotations
 
+import bisect
+import functools
 import json
 import os
 import platform
+import queue
 import re
+import sqlite3
 import subprocess
+import threading
 import time
-from datetime import datetime, timedelta
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
 
-import requests
 import tkinter as tk
 from tkinter import filedialog, messagebox, scrolledtext, simpledialog, ttk
-from requests.adapters import HTTPAdapter
 
-try:
-    from dateutil.relativedelta import relativedelta
-    HAS_DATEUTIL = True
-except ImportError:  # 本地无依赖时退化处理
-    HAS_DATEUTIL = False
+if TYPE_CHECKING:  # requests 在首次联网时才导入，见 _init_http
+    import requests
 
-    def relativedelta(months: int = 0):  # type: ignore
-        return timedelta(days=months * 30)
+try:
+    import orjson
+
+    _loads = orjson.loads
+
+    def _dumps(data: Any) -> bytes:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+except ImportError:  # 没有 orjson 时使用标准库
+    _loads = json.loads
+
+    def _dumps(data: Any) -> bytes:
+        return json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+
+
+# 预编译的解析用正则
+# 行首序号：对整段文本一次性替换（多行模式）。[^\S\n] 是除换行外的空白，
+# 保证不会吃到下一行；调用方先用 "\n".join(splitlines()) 统一换行符
+_LEADING_NUM_STUDENT = re.compile(r"^[^\S\n]*\d+(?:[\.、:：\)\-]|[^\S\n])*", re.M)
+_LEADING_NUM_PAIR = re.compile(r"^[^\S\n]*\d+(?:[\.、:：\)\-–—]|[^\S\n])*", re.M)
+_COLON_RE = re.compile(r"[:：]")
+_NONWORD_RE = re.compile(r"[^\w]")
+_EPOCH = datetime(1970, 1, 1)
+
+_SAFE_NAME_RE = re.compile(r"[^0-9A-Za-z\-_]")
+_FILENAME_SANITIZE_RE = re.compile(r"[<>:\"/\\|?*]")
+# sanitize_username 删除的字符：Unicode 空白（与正则 \s 相同）加零宽空格
+_WS_TRANSLATE = dict.fromkeys(
+    map(
+        ord,
+        " \t\n\r\v\f\x1c\x1d\x1e\x1f\x85\xa0\u1680"
+        "\u2000\u2001\u2002\u2003\u2004\u2005\u2006\u2007\u2008\u2009\u200a"
+        "\u2028\u2029\u202f\u205f\u3000\u200b",
+    )
+)
+_PAIRING_PATTERNS = [
+    re.compile(p, re.IGNORECASE)
+    for p in (
+        r"(.+?)\s+[vs对战VS]\s+(.+?)(?:\s|$)",
+        r"(.+?)\s+-\s+(.+?)(?:\s|$)",
+        r"(.+?)\s+对\s+(.+?)(?:\s|$)",
+        r"(.+?)\s*[:：]\s*(.+?)(?:\s|$)",
+        r"^(.+?)\s+(.+?)$",
+    )
+]
+# 五种格式合并为一个分支正则，分支顺序不变。每种格式都能从行首匹配，
+# 因此一次 match 与依次 search 的结果相同；分支序号由组名后缀给出
+_PAIRING_ALT = re.compile(
+    r"(?P<w0>.+?)\s+[vs对战VS]\s+(?P<b0>.+?)(?:\s|$)"
+    r"|(?P<w1>.+?)\s+-\s+(?P<b1>.+?)(?:\s|$)"
+    r"|(?P<w2>.+?)\s+对\s+(?P<b2>.+?)(?:\s|$)"
+    r"|(?P<w3>.+?)\s*[:：]\s*(?P<b3>.+?)(?:\s|$)"
+    r"|^(?P<w4>.+?)\s+(?P<b4>.+?)$",
+    re.IGNORECASE,
+)
+# 常见分隔符：先用 str.partition 切分，都不适用时才走正则
+_PAIRING_SEPS = (" vs ", " VS ", " - ", " 对战 ", " 对 ", "：", ":")
+
+
+@dataclass
+class ArchiveIndex:
+    """单个月度归档的列式索引。
+
+    end_times 与 pgns 按行对齐，end_times 为 UTC 秒数（缺失时为 -1）并按升序排列；
+    pairs 把 frozenset((白方, 黑方)) 映射到升序的行号列表。
+    """
+
+    end_times: List[int] = field(default_factory=list)
+    pgns: List[str] = field(default_factory=list)
+    pairs: Dict[frozenset, List[int]] = field(default_factory=dict)
+
+
+@dataclass
+class WriteTally:
+    """一局对阵的棋谱写入统计，由后台写入线程在 _write_lock 下更新。"""
+
+    queued: int = 0
+    written: int = 0
+    failed: List[str] = field(default_factory=list)
+
+
+@functools.lru_cache(maxsize=256)
+def _sanitize_name(name: str) -> str:
+    """把名字中文件名不友好的字符替换为下划线；同一学员反复出现时直接命中缓存。"""
+    return _SAFE_NAME_RE.sub("_", name)
+
+
+def _archive_month_index(archive_url: str) -> Optional[int]:
+    """把以 /YYYY/MM 结尾的归档 URL 换算成 年*12+月，格式不符时返回 None。"""
+    tail = archive_url[-8:]
+    if len(tail) == 8 and tail[0] == "/" and tail[5] == "/":
+        year, month = tail[1:5], tail[6:]
+        if year.isdecimal() and month.isdecimal():
+            return int(year) * 12 + int(month)
+    return None
+
+
+def _iter_pairing_candidates(line: str):
+    """按优先级产出 (白方, 黑方) 候选。
+
+    先用常见分隔符直接切分，再给出合并正则的结果；调用方校验失败时，
+    依次尝试其后的格式。
+    """
+    for sep in _PAIRING_SEPS:
+        white, found, black = line.partition(sep)
+        if found:
+            yield white, black
+    match = _PAIRING_ALT.match(line)
+    if not match:
+        return
+    k = int(match.lastgroup[1:])
+    yield match[f"w{k}"], match[f"b{k}"]
+    for pattern in _PAIRING_PATTERNS[k + 1 :]:
+        match = pattern.search(line)
+        if match:
+            yield match.group(1), match.group(2)
 
 
 class TeacherChessApp:
     DATA_FILE = "classes.json"
+    ARCHIVE_DB_FILE = "archive_cache.sqlite"
+    # 磁盘缓存最多保留的归档数，超出时删除最早写入的
+    ARCHIVE_DB_MAX_ROWS = 500
+    SAVE_DELAY_MS = 300
+    DOWNLOAD_WORKERS = 8
+    DOWNLOAD_POLL_MS = 100
+    ARCHIVE_WORKERS = 8
+    # 须小于 DOWNLOAD_WORKERS + ARCHIVE_WORKERS，否则信号量永远不会阻塞
+    HTTP_CONCURRENCY = 6
+    WRITE_QUEUE_SIZE = 100
+    # 学员超过该数量时表格按页延迟加载，滚动到接近底部再追加
+    STUDENT_LAZY_THRESHOLD = 1000
+    STUDENT_PAGE_SIZE = 200
 
     def __init__(self, root: tk.Tk):
         self.root = root
         self.base_dir = Path(__file__).resolve().parent
         self.data_path = self.base_dir / self.DATA_FILE
+        self._save_pending = False
+        self._save_after_id: Optional[str] = None
 
         self.classes_data: Dict[str, Dict] = {}
         self.current_class: str = ""
         self.students: Dict[str, str] = {}
+        self._rebuild_student_index()
         self.parsed_pairings: List[Dict[str, str]] = []
-        self.archive_cache: Dict[str, List[Dict[str, Any]]] = {}
+        # 归档 URL -> 列式索引，按最近使用顺序排列，超过上限时淘汰最久未用的
+        self.archive_cache: "OrderedDict[str, ArchiveIndex]" = OrderedDict()
+        self.archive_cache_max = 64
+        # 玩家归档列表缓存: 用户名 -> (过期时间, 归档 URL 列表)
+        self.player_archive_cache: Dict[str, tuple[float, List[str]]] = {}
+        self._archive_ttl = 600
         self.archive_month_limit = 18
         self.recent_days = 14
-        self.http = requests.Session()
-        self.http.headers.update(
-            {
-                "User-Agent": (
-                    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                    "AppleWebKit/537.36 (KHTML, like Gecko) "
-                    "Chrome/120.0 Safari/537.36"
-                ),
-                "Accept": "application/json, text/plain, */*",
-            }
+        self.http: Optional["requests.Session"] = None
+        self._http_lock = threading.Lock()
+        # 下载池与归档池最多 16 个线程同时联网，共用这 6 个名额，超出的请求排队等待
+        self._http_slots = threading.BoundedSemaphore(self.HTTP_CONCURRENCY)
+        # 下载在线程池中进行，结果经队列交回主线程更新界面
+        self._download_pool = ThreadPoolExecutor(
+            max_workers=self.DOWNLOAD_WORKERS, thread_name_prefix="chess-download"
+        )
+        # 单个对阵的月度归档并发拉取；与下载池分开，避免外层任务占满线程后互相等待
+        self._archive_pool = ThreadPoolExecutor(
+            max_workers=self.ARCHIVE_WORKERS, thread_name_prefix="chess-archive"
         )
-        self.http.mount("https://", HTTPAdapter(max_retries=2))
+        self._archive_lock = threading.Lock()
+        self._inflight: Dict[str, threading.Event] = {}
+        self._inflight_lock = threading.Lock()
+        # 月度归档的磁盘缓存，首次用到时才打开
+        self.archive_db_path = self.base_dir / self.ARCHIVE_DB_FILE
+        self._archive_db: Optional[sqlite3.Connection] = None
+        self._archive_db_failed = False
+        # 磁盘缓存单独加锁，sqlite 读写与提交不会挡住内存缓存的命中
+        self._archive_db_lock = threading.Lock()
+        self._download_queue: "queue.Queue[tuple[int, bool, str]]" = queue.Queue()
+        self._download_running = False
+        self._download_job: Dict[str, Any] = {}
+        # PGN 文件由后台写入线程落盘；队列有上限，写得慢时下载线程会等待
+        self._write_queue: "queue.Queue[tuple[Path, bytes, WriteTally]]" = queue.Queue(
+            maxsize=self.WRITE_QUEUE_SIZE
+        )
+        self._write_lock = threading.Lock()
+        threading.Thread(target=self._writer_loop, name="pgn-writer", daemon=True).start()
+        self._last_ui = 0.0
+        self._pending_status = ""
+        self._log_scheduled = False
 
         self._setup_window()
         self._build_ui()
         self.load_data()
 
+    def _init_http(self) -> "requests.Session":
+        """首次联网时才导入 requests 并创建会话，缩短窗口启动时间。"""
+        if self.http is None:
+            with self._http_lock:
+                if self.http is None:
+                    import requests
+                    from requests.adapters import HTTPAdapter
+                    from urllib3.util.retry import Retry
+
+                    session = requests.Session()
+                    session.headers.update(
+                        {
+                            "User-Agent": (
+                                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+                                "AppleWebKit/537.36 (KHTML, like Gecko) "
+                                "Chrome/120.0 Safari/537.36"
+                            ),
+                            "Accept": "application/json, text/plain, */*",
+                        }
+                    )
+                    # 连接池要容纳所有并发请求，否则多出的连接用完即被丢弃，无法保持长连接
+                    retry = Retry(
+                        total=3,
+                        backoff_factor=0.5,
+                        status_forcelist=(429, 500, 502, 503, 504),
+                        raise_on_status=False,
+                    )
+                    session.mount(
+                        "https://", HTTPAdapter(pool_connections=4, pool_maxsize=32, max_retries=retry)
+                    )
+                    self.http = session
+        return self.http
+
+    def _http_get(self, url: str, **kwargs: Any) -> "requests.Response":
+        """占用一个并发名额发出 GET 请求。"""
+        http = self._init_http()
+        with self._http_slots:
+            return http.get(url, **kwargs)
+
     @staticmethod
+    @functools.lru_cache(maxsize=2048)
     def sanitize_username(username: str) -> str:
         """移除用户名中的空格和不可见字符。"""
-        sanitized = re.sub(r"\s+", "", username.strip())
-        return sanitized
+        return username.translate(_WS_TRANSLATE)
 
     # ------------------------------------------------------------------
     # UI
@@ -161,9 +358,11 @@ class TeacherChessApp:
         self.student_tree.pack(fill=tk.BOTH, expand=True)
         self.student_tree.bind("<Double-1>", self.edit_student)
 
-        scrollbar = ttk.Scrollbar(self.student_tree, orient=tk.VERTICAL, command=self.student_tree.yview)
-        self.student_tree.configure(yscrollcommand=scrollbar.set)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.student_scrollbar = ttk.Scrollbar(self.student_tree, orient=tk.VERTICAL, command=self.student_tree.yview)
+        self.student_tree.configure(yscrollcommand=self._on_student_yscroll)
+        self.student_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self._tree_loaded = 0
+        self._tree_load_scheduled = False
 
     def _build_pairing_tab(self) -> None:
         top = ttk.Frame(self.pairing_tab)
@@ -212,8 +411,15 @@ class TeacherChessApp:
         self.progress.pack(side=tk.RIGHT)
 
     def log(self, text: str) -> None:
-        self.status_var.set(text)
-        self.root.update_idletasks()
+        """更新状态栏。30ms 内的多次调用合并，只显示最后一条。"""
+        self._pending_status = text
+        if not self._log_scheduled:
+            self._log_scheduled = True
+            self.root.after(30, self._flush_log)
+
+    def _flush_log(self) -> None:
+        self._log_scheduled = False
+        self.status_var.set(self._pending_status)
 
     # ------------------------------------------------------------------
     # 数据读写
@@ -223,6 +429,7 @@ class TeacherChessApp:
             self.classes_data = {}
             self.current_class = ""
             self.students = {}
+            self._rebuild_student_index()
             self._refresh_class_widgets()
             return
 
@@ -234,6 +441,7 @@ class TeacherChessApp:
             self.classes_data = {}
             self.current_class = ""
             self.students = {}
+            self._rebuild_student_index()
             self._refresh_class_widgets()
             return
 
@@ -254,15 +462,31 @@ class TeacherChessApp:
         self._refresh_class_widgets()
         self.log("数据加载完成")
 
-    def save_data(self) -> None:
+    def save_data(self, immediate: bool = False) -> None:
+        """保存数据。默认延迟写入，短时间内的多次调用只写一次文件。"""
+        if immediate:
+            if self._save_after_id is not None:
+                self.root.after_cancel(self._save_after_id)
+            self._flush_save()
+            return
+        if not self._save_pending:
+            self._save_pending = True
+            self._save_after_id = self.root.after(self.SAVE_DELAY_MS, self._flush_save)
+
+    def _flush_save(self) -> None:
+        self._save_pending = False
+        self._save_after_id = None
         payload = {
             "classes": self.classes_data,
             "current_class": self.current_class,
             "settings": {"round_folder_format": "{class_name}-round{round_number}"},
         }
+        # 先写临时文件再原子替换，避免中途失败留下半个文件
+        tmp_path = self.data_path.with_suffix(".json.tmp")
         try:
-            with self.data_path.open("w", encoding="utf-8") as f:
-                json.dump(payload, f, ensure_ascii=False, indent=2)
+            with tmp_path.open("wb") as f:
+                f.write(_dumps(payload))
+            os.replace(tmp_path, self.data_path)
             self.log("数据已保存")
         except Exception as exc:
             messagebox.showerror("保存失败", f"无法写入 {self.data_path.name}: {exc}")
@@ -276,6 +500,7 @@ class TeacherChessApp:
                 self.students = {}
         else:
             self.students = {}
+        self._rebuild_student_index()
 
     def _refresh_class_widgets(self) -> None:
         class_names = list(self.classes_data)
@@ -380,10 +605,35 @@ class TeacherChessApp:
         self.class_info.configure(state=tk.DISABLED)
 
     def _update_student_tree(self) -> None:
-        for item in self.student_tree.get_children():
-            self.student_tree.delete(item)
-        for name, username in sorted(self.students.items()):
-            self.student_tree.insert("", tk.END, values=(name, username))
+        tree = self.student_tree
+        tree.delete(*tree.get_children())
+        self._tree_loaded = 0
+        if len(self._sorted_students) <= self.STUDENT_LAZY_THRESHOLD:
+            for item in self._sorted_students:
+                tree.insert("", tk.END, values=item)
+            self._tree_loaded = len(self._sorted_students)
+        else:
+            self._load_more_students()
+
+    def _load_more_students(self) -> None:
+        """向表格追加下一页学员（大名单延迟加载）。"""
+        self._tree_load_scheduled = False
+        start = self._tree_loaded
+        rows = self._sorted_students[start : start + self.STUDENT_PAGE_SIZE]
+        for item in rows:
+            self.student_tree.insert("", tk.END, values=item)
+        self._tree_loaded = start + len(rows)
+
+    def _on_student_yscroll(self, first: str, last: str) -> None:
+        self.student_scrollbar.set(first, last)
+        # 滚动到接近底部且还有未加载的学员时，空闲时追加一页
+        if (
+            float(last) >= 0.9
+            and self._tree_loaded < len(self._sorted_students)
+            and not self._tree_load_scheduled
+        ):
+            self._tree_load_scheduled = True
+            self.root.after_idle(self._load_more_students)
 
     # ------------------------------------------------------------------
     # 学员操作
@@ -401,6 +651,7 @@ class TeacherChessApp:
                 messagebox.showwarning("提示", "用户名不能为空。")
                 return
             self.students[name] = username
+            self._rebuild_student_index()
             self._update_student_tree()
             self.save_data()
             self.log(f"添加学员 {name}")
@@ -424,6 +675,7 @@ class TeacherChessApp:
             if new_name != name:
                 self.students.pop(name, None)
             self.students[new_name] = new_username
+            self._rebuild_student_index()
             self._update_student_tree()
             self.save_data()
             self.log(f"更新学员 {new_name}")
@@ -441,6 +693,7 @@ class TeacherChessApp:
         if not messagebox.askyesno("确认删除", f"确定删除学员 '{name}'?"):
             return
         self.students.pop(name, None)
+        self._rebuild_student_index()
         self._update_student_tree()
         self.save_data()
         self.log(f"删除学员 {name}")
@@ -458,6 +711,7 @@ class TeacherChessApp:
             messagebox.showwarning("提示", "未能解析学员信息，请检查格式。")
             return
         self.students.update(parsed)
+        self._rebuild_student_index()
         self._update_student_tree()
         self.save_data()
         messagebox.showinfo("导入完成", f"成功导入 {len(parsed)} 名学员。")
@@ -484,6 +738,7 @@ class TeacherChessApp:
             messagebox.showwarning("提示", "未能解析学员信息，请检查文本格式。")
             return
         self.students.update(parsed)
+        self._rebuild_student_index()
         self._update_student_tree()
         self.save_data()
         messagebox.showinfo("导入完成", f"成功导入 {len(parsed)} 名学员。")
@@ -491,12 +746,12 @@ class TeacherChessApp:
 
     def parse_students_list(self, content: str) -> Dict[str, str]:
         students: Dict[str, str] = {}
-        for raw in content.splitlines():
+        # 一次替换去掉所有行首序号，再逐行处理
+        text = _LEADING_NUM_STUDENT.sub("", "\n".join(content.splitlines()))
+        for raw in text.split("\n"):
             line = raw.strip()
             if not line:
                 continue
-            line = re.sub(r"^[\s\u3000]*\d+[\.、:：\)\-\s]*", "", line)
-            line = line.strip()
             for sep in ("->", "：", ":", "-", "—"):
                 if sep in line:
                     left, right = line.rsplit(sep, 1)
@@ -513,7 +768,7 @@ class TeacherChessApp:
             if name and username:
                 # 处理姓名或用户名中继续出现冒号的情况
                 if any(sep in username for sep in (":", "：")):
-                    parts = re.split(r"[:：]", username)
+                    parts = _COLON_RE.split(username)
                     username_candidate = parts[-1].strip()
                     name_tail = " ".join(p.strip() for p in parts[:-1] if p.strip())
                     if username_candidate:
@@ -584,18 +839,25 @@ class TeacherChessApp:
         output_lines.append("")
         output_lines.append(f"共 {len(self.parsed_pairings)} 局，对应用户名 {matched} 局匹配成功")
 
-        self.result_text.delete("1.0", tk.END)
-        self.result_text.insert("1.0", "\n".join(output_lines))
+        self._fill_result_text(output_lines)
         self.log("对阵解析完成")
 
+    def _fill_result_text(self, lines: List[str], batch: int = 1000) -> None:
+        """分批写入解析结果，避免一次性拼接和插入超长字符串。"""
+        widget = self.result_text
+        widget.delete("1.0", tk.END)
+        for start in range(0, len(lines), batch):
+            chunk = "\n".join(lines[start : start + batch])
+            if start + batch < len(lines):
+                chunk += "\n"
+            widget.insert(tk.END, chunk)
+
     def parse_pairings_content(self, content: str) -> List[Dict[str, str]]:
         pairings: List[Dict[str, str]] = []
-        for raw in content.splitlines():
+        # 一次替换去掉所有行首序号，再逐行提取对阵
+        text = _LEADING_NUM_PAIR.sub("", "\n".join(content.splitlines()))
+        for raw in text.split("\n"):
             line = raw.strip()
-            if not line:
-                continue
-            line = re.sub(r"^\s*\d+[\.、:：\)\-–—\s]*", "", line)
-            line = line.strip()
             if not line:
                 continue
             pairing = self._extract_pairing(line)
@@ -604,27 +866,54 @@ class TeacherChessApp:
         return pairings
 
     def _extract_pairing(self, line: str) -> Optional[Dict[str, str]]:
-        patterns = [
-            r"(.+?)\s+[vs对战VS]\s+(.+?)(?:\s|$)",
-            r"(.+?)\s+-\s+(.+?)(?:\s|$)",
-            r"(.+?)\s+对\s+(.+?)(?:\s|$)",
-            r"(.+?)\s*[:：]\s*(.+?)(?:\s|$)",
-            r"^(.+?)\s+(.+?)$",
-        ]
-        for pattern in patterns:
-            match = re.search(pattern, line, re.IGNORECASE)
-            if match:
-                white = match.group(1).strip()
-                black = match.group(2).strip()
-                if white and black and not white.isdigit() and not black.isdigit():
-                    return {
-                        "white": white,
-                        "black": black,
-                        "white_username": self.find_username(white),
-                        "black_username": self.find_username(black),
-                    }
+        for white, black in _iter_pairing_candidates(line):
+            white = white.strip()
+            black = black.strip()
+            if white and black and not white.isdigit() and not black.isdigit():
+                return {
+                    "white": white,
+                    "black": black,
+                    "white_username": self._find_cached(white),
+                    "black_username": self._find_cached(black),
+                }
         return None
 
+    def _rebuild_student_index(self) -> None:
+        """按当前学员名单重建 find_username 用的索引，名单变化后调用。"""
+        self._find_cache: Dict[str, str] = {}
+        # 各索引只记录最先出现的学员，与逐个扫描时的命中顺序一致
+        self._sx_exact: Dict[str, str] = {}
+        self._sx_first: Dict[str, str] = {}
+        self._sx_tokens: Dict[str, int] = {}
+        self._sx_clean: Dict[str, str] = {}
+        self._sx_lower: List[tuple[str, str]] = []
+        self._sx_usernames: List[str] = []
+        # 学员表格按姓名排序显示，排序结果也在名单变化时才重新计算
+        self._sorted_students = sorted(self.students.items())
+        for idx, (real_name, username) in enumerate(self.students.items()):
+            real_lower = real_name.lower()
+            real_first = real_lower.split()[0] if real_name.split() else real_lower
+            self._sx_exact.setdefault(real_lower, username)
+            self._sx_first.setdefault(real_first, username)
+            for seg in real_name.split():
+                if len(seg) > 1:
+                    self._sx_tokens.setdefault(seg.lower(), idx)
+            clean = _NONWORD_RE.sub("", real_lower)
+            if clean:
+                self._sx_clean.setdefault(clean, username)
+            self._sx_lower.append((real_lower, username))
+            self._sx_usernames.append(username)
+        # (小写姓名, 名单序号) 有序表，用于 bisect 快速找出前缀匹配；必须在 _sx_lower 填好之后构建
+        self._sx_sorted = sorted((real_lower, idx) for idx, (real_lower, _) in enumerate(self._sx_lower))
+        self._sx_sorted_keys = [key for key, _ in self._sx_sorted]
+
+    def _find_cached(self, name: str) -> str:
+        """带缓存的 find_username，缓存随学员索引一起重建。"""
+        username = self._find_cache.get(name)
+        if username is None:
+            username = self._find_cache[name] = self.find_username(name)
+        return username
+
     def find_username(self, name: str) -> str:
         if not name:
             return "未找到"
@@ -632,36 +921,44 @@ class TeacherChessApp:
         if name in self.students:
             return self.students[name]
         lower = name.lower()
-        for real_name, username in self.students.items():
-            if real_name.lower() == lower:
+        username = self._sx_exact.get(lower)
+        if username is not None:
+            return username
+        # 子串匹配按名单顺序取第一个。前缀匹配也是子串匹配，先用二分找出名单中
+        # 最靠前的前缀匹配（如 "kyle" -> "kyle zhang"），线性扫描只需查它之前的学员
+        keys = self._sx_sorted_keys
+        lo = bisect.bisect_left(keys, lower)
+        hi = bisect.bisect_left(keys, lower + "\U0010ffff", lo)
+        limit = min((idx for _, idx in self._sx_sorted[lo:hi]), default=len(self._sx_lower))
+        for real_lower, username in self._sx_lower[:limit]:
+            if lower in real_lower:
                 return username
-        for real_name, username in self.students.items():
-            if lower in real_name.lower():
-                return username
-        for real_name, username in self.students.items():
-            if real_name.lower() in lower:
+        if limit < len(self._sx_lower):
+            return self._sx_usernames[limit]
+        for real_lower, username in self._sx_lower:
+            if real_lower in lower:
                 return username
         parts = lower.split()
         first = parts[0] if parts else lower
-        for real_name, username in self.students.items():
-            real_first = real_name.lower().split()[0] if real_name.split() else real_name.lower()
-            if first == real_first and len(first) > 1:
-                return username
-        filtered = [p for p in parts if len(p) > 1]
-        for real_name, username in self.students.items():
-            real_parts = [seg.lower() for seg in real_name.split() if len(seg) > 1]
-            if set(filtered) & set(real_parts):
-                return username
-        clean = re.sub(r"[^\w]", "", lower)
-        for real_name, username in self.students.items():
-            if clean and clean == re.sub(r"[^\w]", "", real_name.lower()):
+        if len(first) > 1:
+            username = self._sx_first.get(first)
+            if username is not None:
                 return username
+        hits = [self._sx_tokens[p] for p in parts if len(p) > 1 and p in self._sx_tokens]
+        if hits:
+            return self._sx_usernames[min(hits)]
+        clean = _NONWORD_RE.sub("", lower)
+        if clean:
+            return self._sx_clean.get(clean, "未找到")
         return "未找到"
 
     # ------------------------------------------------------------------
     # 下载
     # ------------------------------------------------------------------
     def download_games(self) -> None:
+        if self._download_running:
+            messagebox.showwarning("提示", "正在下载，请等待当前任务完成。")
+            return
         if not self.parsed_pairings:
             messagebox.showwarning("提示", "请先解析对阵表。")
             return
@@ -673,41 +970,156 @@ class TeacherChessApp:
         folder = self._prepare_download_folder(round_name)
         total = len(self.parsed_pairings)
         self.progress["maximum"] = total
-        success = 0
-        failed: List[str] = []
+        self.progress["value"] = 0
+        self._init_http()
+        results: Dict[int, tuple[bool, str]] = {}
+        tallies: Dict[int, WriteTally] = {}
+        submitted = 0
 
         for idx, pairing in enumerate(self.parsed_pairings, 1):
-            self.progress["value"] = idx
             white_user = pairing.get("white_username", "未找到")
             black_user = pairing.get("black_username", "未找到")
             white_name = pairing.get("white", "")
             black_name = pairing.get("black", "")
 
-            self.log(f"下载 {idx}/{total}: {white_name} vs {black_name}")
-
             if white_user == "未找到" or black_user == "未找到":
-                failed.append(f"第{idx}局 {white_name} vs {black_name} (用户名未匹配)")
+                results[idx] = (False, "用户名未匹配")
                 continue
 
-            ok, detail = self.download_pairing_games(
+            tally = tallies[idx] = WriteTally()
+            self._download_pool.submit(
+                self._download_task,
+                idx,
                 white_user,
                 black_user,
                 white_name,
                 black_name,
                 folder,
+                tally,
             )
+            submitted += 1
+
+        self._download_running = True
+        self._download_job = {
+            "folder": folder,
+            "round_name": round_name,
+            "class_name": self.current_class,
+            "pairings": list(self.parsed_pairings),
+            "results": results,
+            "tallies": tallies,
+        }
+        self.progress["value"] = len(results)
+        self.log(f"开始下载 {submitted} 局对阵…")
+        self.root.after(self.DOWNLOAD_POLL_MS, self._poll_downloads)
+
+    def _download_task(self, idx: int, *args: Any) -> None:
+        """在线程池中运行：下载一局对阵并把结果放入队列，不直接操作 Tk。"""
+        try:
+            ok, detail = self.download_pairing_games(*args)
+        except Exception as exc:  # 保证每个任务都有结果，否则主线程会一直等待
+            ok, detail = False, f"下载出错: {exc}"
+        self._download_queue.put((idx, ok, detail))
+
+    def _writer_loop(self) -> None:
+        """后台写入线程：依次把队列中的棋谱写入文件。"""
+        while True:
+            filepath, data, tally = self._write_queue.get()
+            # 直接用 os.write 写入，省去文本包装层；棋谱可重新下载，不做 fsync
+            try:
+                fd = os.open(str(filepath), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+                try:
+                    # os.write 可能只写入一部分（磁盘满、单次写入上限），循环直到写完
+                    view = memoryview(data)
+                    while view:
+                        written = os.write(fd, view)
+                        if written <= 0:
+                            raise OSError("写入不完整")
+                        view = view[written:]
+                finally:
+                    os.close(fd)
+            except OSError:
+                with self._write_lock:
+                    tally.failed.append(filepath.name)
+            else:
+                with self._write_lock:
+                    tally.written += 1
+            finally:
+                self._write_queue.task_done()
+
+    def _poll_downloads(self) -> None:
+        job = self._download_job
+        results = job["results"]
+        pairings = job["pairings"]
+        total = len(pairings)
+        last_idx = 0
+        while True:
+            try:
+                idx, ok, detail = self._download_queue.get_nowait()
+            except queue.Empty:
+                break
+            results[idx] = (ok, detail)
+            last_idx = idx
+
+        # 界面最多每 0.1 秒刷新一次；结束时 _finish_downloads 会再刷新一次
+        now = time.monotonic()
+        if last_idx and now - self._last_ui >= 0.1:
+            pairing = pairings[last_idx - 1]
+            self.status_var.set(f"下载 {len(results)}/{total}: {pairing.get('white', '')} vs {pairing.get('black', '')}")
+            self.progress["value"] = len(results)
+            self.root.update_idletasks()
+            self._last_ui = now
+
+        if len(results) < total:
+            self.root.after(self.DOWNLOAD_POLL_MS, self._poll_downloads)
+            return
+        # 下载都结束后，继续轮询直到后台线程写完本次任务的棋谱，不阻塞主线程
+        if self._job_writes_pending(job):
+            self.status_var.set("正在写入棋谱文件…")
+            self.root.after(self.DOWNLOAD_POLL_MS, self._poll_downloads)
+            return
+        self._download_running = False
+        self._finish_downloads()
+
+    def _job_writes_pending(self, job: Dict[str, Any]) -> bool:
+        """本次任务中是否还有已排队但尚未写完（成功或失败）的棋谱。"""
+        with self._write_lock:
+            return any(
+                tally.queued != tally.written + len(tally.failed) for tally in job["tallies"].values()
+            )
+
+    def _finish_downloads(self) -> None:
+        job = self._download_job
+        folder: Path = job["folder"]
+        results = job["results"]
+        pairings = job["pairings"]
+        tallies: Dict[int, WriteTally] = job["tallies"]
+        total = len(pairings)
+        success = 0
+        failed: List[str] = []
+        partial: List[str] = []
+        for idx, pairing in enumerate(pairings, 1):
+            ok, detail = results[idx]
+            label = f"第{idx}局 {pairing.get('white', '')} vs {pairing.get('black', '')}"
+            tally = tallies.get(idx)
+            with self._write_lock:
+                written, write_failed = (tally.written, len(tally.failed)) if tally else (0, 0)
+            if ok and write_failed:
+                if not written:
+                    ok, detail = False, "找到对局但保存失败"
+                else:
+                    partial.append(f"{label} (保存 {written} 局，{write_failed} 局写入失败)")
             if ok:
                 success += 1
             else:
-                failed.append(f"第{idx}局 {white_name} vs {black_name} ({detail})")
+                failed.append(f"{label} ({detail})")
 
         self.progress["value"] = total
         report_path = folder / "下载报告.txt"
         with report_path.open("w", encoding="utf-8") as f:
             f.write(f"下载报告 - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
             f.write("=" * 60 + "\n")
-            f.write(f"班级: {self.current_class}\n")
-            f.write(f"轮次: {round_name}\n")
+            f.write(f"班级: {job['class_name']}\n")
+            f.write(f"轮次: {job['round_name']}\n")
             f.write(f"对阵总数: {total}\n")
             f.write(f"成功下载: {success}\n")
             f.write(f"失败: {len(failed)}\n\n")
@@ -715,6 +1127,10 @@ class TeacherChessApp:
                 f.write("失败详情:\n")
                 for item in failed:
                     f.write(f"- {item}\n")
+            if partial:
+                f.write("部分棋谱写入失败:\n")
+                for item in partial:
+                    f.write(f"- {item}\n")
 
         messagebox.showinfo(
             "下载完成",
@@ -734,8 +1150,8 @@ class TeacherChessApp:
         self.log("下载完成")
 
     def _prepare_download_folder(self, round_name: str) -> Path:
-        safe_class = re.sub(r"[^0-9A-Za-z\-_]", "_", self.current_class) or "class"
-        safe_round = re.sub(r"[^0-9A-Za-z\-_]", "_", round_name) or "Round"
+        safe_class = _sanitize_name(self.current_class) or "class"
+        safe_round = _sanitize_name(round_name) or "Round"
         folder_name = f"{safe_class}-round-{safe_round}"
         folder = self.base_dir / folder_name
         if folder.exists():
@@ -751,7 +1167,9 @@ class TeacherChessApp:
         white_display: str,
         black_display: str,
         folder: Path,
+        tally: Optional[WriteTally] = None,
     ) -> tuple[bool, str]:
+        """查找双方最近的对局并交给后台线程写入；写入结果记在 tally 中。"""
         white_api = self.sanitize_username(white_username).lower()
         black_api = self.sanitize_username(black_username).lower()
 
@@ -767,27 +1185,32 @@ class TeacherChessApp:
         else:
             black_err = ""
 
-        matched_games: List[Dict[str, Any]] = []
+        # (结束时间, PGN)
+        matched_games: List[tuple[int, str]] = []
         last_error = ""
         cutoff = datetime.utcnow() - timedelta(days=self.recent_days)
-        considered_archives = [url for url in archives if self.is_archive_recent(url)]
-        if not considered_archives:
-            considered_archives = archives[-self.archive_month_limit :]
+        cutoff_ts = int((cutoff - _EPOCH).total_seconds())
 
-        for archive_url in reversed(considered_archives):
-            games, err = self.get_archive_games(archive_url)
+        target_pair = frozenset((white_api, black_api))
+        futures = [
+            self._archive_pool.submit(self.get_archive_games, archive_url)
+            for archive_url in self._iter_cutoff_archives(archives, cutoff)
+        ]
+        # 请求并发进行，但按提交顺序（从新到旧）取结果，保证文件名序号每次一致
+        for future in futures:
+            index, err = future.result()
             if err:
                 last_error = err
                 continue
-            for game in games:
-                game_white = game.get("white", {}).get("username", "").lower()
-                game_black = game.get("black", {}).get("username", "").lower()
-                if {game_white, game_black} != {white_api, black_api}:
-                    continue
-                game_time = self.extract_game_time(game)
-                if game_time and game_time < cutoff:
-                    continue
-                matched_games.append(game)
+            rows = index.pairs.get(target_pair)
+            if not rows:
+                continue
+            # 行号与时间同为升序：没有时间的对局排在最前且一律保留，之后只取截止时间以后的
+            end_times, pgns = index.end_times, index.pgns
+            undated = bisect.bisect_left(rows, bisect.bisect_left(end_times, 0))
+            start = bisect.bisect_left(rows, bisect.bisect_left(end_times, cutoff_ts))
+            for row in rows[:undated] + rows[start:]:
+                matched_games.append((end_times[row], pgns[row]))
 
         if not matched_games:
             if white_err and not archives:
@@ -798,43 +1221,84 @@ class TeacherChessApp:
                 return False, last_error
             return False, f"未找到双方在最近{self.recent_days}天的对局"
 
-        safe_white = re.sub(r"[^0-9A-Za-z\-_]", "_", white_display) or "white"
-        safe_black = re.sub(r"[^0-9A-Za-z\-_]", "_", black_display) or "black"
+        safe_white = _sanitize_name(white_display) or "white"
+        safe_black = _sanitize_name(black_display) or "black"
 
-        saved_any = False
-        for idx, game in enumerate(matched_games, 1):
-            pgn = game.get("pgn")
+        if tally is None:
+            tally = WriteTally()
+        for idx, (end_time, pgn) in enumerate(matched_games, 1):
             if not pgn:
                 continue
-            game_time = self.extract_game_time(game)
-            if game_time:
-                dt_str = game_time.strftime("%Y%m%d_%H%M")
+            if end_time >= 0:
+                dt_str = (_EPOCH + timedelta(seconds=end_time)).strftime("%Y%m%d_%H%M")
             else:
                 dt_str = datetime.utcnow().strftime("%Y%m%d_%H%M")
             filename = f"{safe_white}_vs_{safe_black}_{dt_str}_{idx}.pgn"
-            filename = re.sub(r"[<>:\"/\\|?*]", "_", filename)
+            filename = _FILENAME_SANITIZE_RE.sub("_", filename)
             filepath = folder / filename
-            try:
-                with filepath.open("w", encoding="utf-8") as f:
-                    f.write(pgn)
-                    if not pgn.endswith("\n"):
-                        f.write("\n")
-            except OSError:
-                continue
-            saved_any = True
-            time.sleep(0.2)
-
-        if not saved_any:
+            data = pgn.encode("utf-8")
+            if not data.endswith(b"\n"):
+                data += b"\n"
+            with self._write_lock:
+                tally.queued += 1
+            self._write_queue.put((filepath, data, tally))
+
+        if not tally.queued:
             return False, "找到对局但保存失败"
 
-        return True, f"保存 {len(matched_games)} 局"
+        return True, f"排队写入 {tally.queued} 局"
+
+    def _iter_recent_archives(self, archives: List[str]):
+        """从新到旧产出需要扫描的归档 URL。
+
+        只取最近三个月的归档；一个都没有时退回最近 archive_month_limit 个。
+        过滤与遍历在同一遍中完成，不生成中间列表。
+        """
+        now = datetime.utcnow()
+        min_month = now.year * 12 + now.month - 2
+        found = False
+        for url in reversed(archives):
+            if (_archive_month_index(url) or min_month) >= min_month:
+                found = True
+                yield url
+        if not found:
+            yield from reversed(archives[-self.archive_month_limit :])
+
+    def _iter_cutoff_archives(self, archives: List[str], cutoff: datetime):
+        """从新到旧产出可能含有截止时间之后对局的归档 URL。"""
+        now = datetime.utcnow()
+        if self.recent_days < 60:
+            # 常见情况只涉及当月和上月：按 /YYYY/MM 后缀直接挑出目标月份
+            suffixes = []
+            year, month = cutoff.year, cutoff.month
+            while (year, month) <= (now.year, now.month):
+                suffixes.append(f"/{year:04d}/{month:02d}")
+                year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+            targets = tuple(suffixes)
+            for url in reversed(archives):
+                if url.endswith(targets):
+                    yield url
+            return
+
+        # 归档从新到旧排列，某月整月早于截止时间后，更早的月份都不必再请求
+        cutoff_month = cutoff.year * 12 + cutoff.month
+        for url in self._iter_recent_archives(archives):
+            month = _archive_month_index(url)
+            if month is not None and month < cutoff_month:
+                break
+            yield url
 
     def get_player_archives(self, username: str) -> tuple[List[str], str]:
         if not username:
             return [], "用户名缺失"
+        cached = self.player_archive_cache.get(username)
+        if cached and cached[0] > time.monotonic():
+            return cached[1], ""
         url = f"https://api.chess.com/pub/player/{username}/games/archives"
+        import requests
+
         try:
-            resp = self.http.get(url, timeout=10)
+            resp = self._http_get(url, timeout=10)
         except requests.RequestException as exc:
             return [], f"网络错误: {exc}"
         if resp.status_code == 404:
@@ -843,39 +1307,179 @@ class TeacherChessApp:
             return [], "HTTP 403 (访问被拒绝)"
         if resp.status_code != 200:
             return [], f"HTTP {resp.status_code}"
-        data = resp.json()
-        archives = data.get("archives", [])
-        return archives if isinstance(archives, list) else [], ""
-
-    def get_archive_games(self, archive_url: str) -> tuple[List[Dict[str, Any]], str]:
-        if archive_url in self.archive_cache:
-            return self.archive_cache[archive_url], ""
         try:
-            resp = self.http.get(archive_url, timeout=15)
-        except requests.Timeout:
-            return [], "请求超时"
-        except requests.RequestException as exc:
-            return [], f"网络错误: {exc}"
-        if resp.status_code != 200:
-            if resp.status_code == 403:
-                return [], "HTTP 403 (访问被拒绝)"
-            return [], f"HTTP {resp.status_code}"
-        data = resp.json()
+            data = _loads(resp.content)
+        except ValueError:
+            return [], "数据格式错误"
+        archives = data.get("archives", []) if isinstance(data, dict) else []
+        if not isinstance(archives, list):
+            archives = []
+        self.player_archive_cache[username] = (time.monotonic() + self._archive_ttl, archives)
+        return archives, ""
+
+    def _open_archive_db(self) -> Optional[sqlite3.Connection]:
+        """打开归档磁盘缓存；调用方需持有 _archive_db_lock。打开失败时不再重试。"""
+        if self._archive_db is None and not self._archive_db_failed:
+            try:
+                conn = sqlite3.connect(str(self.archive_db_path), check_same_thread=False)
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS archives ("
+                    "url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, body BLOB)"
+                )
+                conn.commit()
+                self._archive_db = conn
+            except sqlite3.Error:
+                self._archive_db_failed = True
+        return self._archive_db
+
+    def _load_archive_row(self, archive_url: str) -> Optional[tuple[str, str, bytes]]:
+        with self._archive_db_lock:
+            conn = self._open_archive_db()
+            if conn is None:
+                return None
+            try:
+                row = conn.execute(
+                    "SELECT etag, last_modified, body FROM archives WHERE url = ?",
+                    (archive_url,),
+                ).fetchone()
+            except sqlite3.Error:
+                return None
+        if row is None:
+            return None
+        return row[0] or "", row[1] or "", bytes(row[2])
+
+    def _store_archive_row(self, archive_url: str, etag: str, last_modified: str, body: bytes) -> None:
+        with self._archive_db_lock:
+            conn = self._open_archive_db()
+            if conn is None:
+                return
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO archives (url, etag, last_modified, body) VALUES (?, ?, ?, ?)",
+                    (archive_url, etag, last_modified, sqlite3.Binary(body)),
+                )
+                # INSERT OR REPLACE 会分配新的 rowid，rowid 越小写入越早
+                conn.execute(
+                    "DELETE FROM archives WHERE rowid NOT IN "
+                    "(SELECT rowid FROM archives ORDER BY rowid DESC LIMIT ?)",
+                    (self.ARCHIVE_DB_MAX_ROWS,),
+                )
+                conn.commit()
+            except sqlite3.Error:
+                pass
+
+    def _parse_archive_body(self, body: bytes) -> Optional[ArchiveIndex]:
+        """解析归档 JSON，只保留结束时间与 PGN 两列，并按对阵双方建索引。"""
+        try:
+            data = _loads(body)
+        except ValueError:
+            return None
         games = data.get("games", []) if isinstance(data, dict) else []
-        if isinstance(games, list):
-            self.archive_cache[archive_url] = games
-            return games, ""
-        return [], "数据格式错误"
-
-    def is_archive_recent(self, archive_url: str) -> bool:
-        match = re.search(r"/(\d{4})/(\d{2})$", archive_url)
-        if not match:
-            return True
-        year, month = map(int, match.groups())
-        now = datetime.utcnow()
-        current_total = now.year * 12 + now.month
-        archive_total = year * 12 + month
-        return (current_total - archive_total) <= 2
+        if not isinstance(games, list):
+            return None
+        rows = []
+        for game in games:
+            game_time = self.extract_game_time(game)
+            rows.append(
+                (
+                    int((game_time - _EPOCH).total_seconds()) if game_time else -1,
+                    game.get("white", {}).get("username", "").lower(),
+                    game.get("black", {}).get("username", "").lower(),
+                    game.get("pgn") or "",
+                )
+            )
+        # chess.com 一般已按时间排序，这里再稳定排序一次，保证可以二分
+        rows.sort(key=lambda item: item[0])
+        index = ArchiveIndex()
+        for row, (end_time, white, black, pgn) in enumerate(rows):
+            index.end_times.append(end_time)
+            index.pgns.append(pgn)
+            index.pairs.setdefault(frozenset((white, black)), []).append(row)
+        return index
+
+    def _cached_archive(self, archive_url: str) -> Optional[ArchiveIndex]:
+        with self._archive_lock:
+            index = self.archive_cache.get(archive_url)
+            if index is not None:
+                self.archive_cache.move_to_end(archive_url)
+            return index
+
+    def _remember_archive(self, archive_url: str, index: ArchiveIndex) -> None:
+        with self._archive_lock:
+            self.archive_cache[archive_url] = index
+            self.archive_cache.move_to_end(archive_url)
+            while len(self.archive_cache) > self.archive_cache_max:
+                self.archive_cache.popitem(last=False)
+
+    def get_archive_games(self, archive_url: str) -> tuple[ArchiveIndex, str]:
+        cached = self._cached_archive(archive_url)
+        if cached is not None:
+            return cached, ""
+
+        # 同一归档同时只发一次请求，其余线程等待结果后直接读缓存
+        with self._inflight_lock:
+            event = self._inflight.get(archive_url)
+            leader = event is None
+            if leader:
+                event = self._inflight[archive_url] = threading.Event()
+        if not leader:
+            event.wait()
+            cached = self._cached_archive(archive_url)
+            if cached is not None:
+                return cached, ""
+            return self._fetch_archive_games(archive_url)
+        try:
+            return self._fetch_archive_games(archive_url)
+        finally:
+            with self._inflight_lock:
+                del self._inflight[archive_url]
+            event.set()
+
+    def _fetch_archive_games(self, archive_url: str) -> tuple[ArchiveIndex, str]:
+        row = self._load_archive_row(archive_url)
+        games: Optional[ArchiveIndex] = None
+        if row is not None:
+            # 早于上个月的归档已经封存不会再变，直接使用磁盘缓存，无需联网
+            month = _archive_month_index(archive_url)
+            now = datetime.utcnow()
+            if month is not None and month < now.year * 12 + now.month - 1:
+                games = self._parse_archive_body(row[2])
+
+        if games is None:
+            headers: Dict[str, str] = {}
+            if row is not None:
+                if row[0]:
+                    headers["If-None-Match"] = row[0]
+                if row[1]:
+                    headers["If-Modified-Since"] = row[1]
+            import requests
+
+            try:
+                resp = self._http_get(archive_url, timeout=15, headers=headers)
+            except requests.Timeout:
+                return ArchiveIndex(), "请求超时"
+            except requests.RequestException as exc:
+                return ArchiveIndex(), f"网络错误: {exc}"
+            if resp.status_code == 304 and row is not None:
+                games = self._parse_archive_body(row[2])
+            elif resp.status_code != 200:
+                if resp.status_code == 403:
+                    return ArchiveIndex(), "HTTP 403 (访问被拒绝)"
+                return ArchiveIndex(), f"HTTP {resp.status_code}"
+            else:
+                games = self._parse_archive_body(resp.content)
+                if games is not None:
+                    self._store_archive_row(
+                        archive_url,
+                        resp.headers.get("ETag", ""),
+                        resp.headers.get("Last-Modified", ""),
+                        resp.content,
+                    )
+
+        if games is None:
+            return ArchiveIndex(), "数据格式错误"
+        self._remember_archive(archive_url, games)
+        return games, ""
 
     def extract_game_time(self, game: Dict[str, Any]) -> Optional[datetime]:
         timestamp = (
@@ -890,11 +1494,14 @@ class TeacherChessApp:
             except (OverflowError, OSError, ValueError):
                 return None
         if isinstance(timestamp, str):
-            for fmt in ("%Y-%m-%dT%H:%M:%S.%fZ", "%Y-%m-%dT%H:%M:%SZ"):
-                try:
-                    return datetime.strptime(timestamp, fmt)
-                except ValueError:
-                    continue
+            # fromisoformat 由 C 实现，比 strptime 快得多；统一转为不带时区的 UTC 时间
+            try:
+                parsed = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+            except ValueError:
+                return None
+            if parsed.tzinfo is not None:
+                parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+            return parsed
         return None
 
 
@@ -946,39 +1553,70 @@ def simple_input(title: str, prompt: str) -> Optional[str]:
     return dialog.strip()
 
 
-def multiline_input(title: str, prompt: str, default: str = "") -> Optional[str]:
-    dialog = tk.Toplevel()
-    dialog.title(title)
-    dialog.transient()
-    dialog.grab_set()
-    dialog.resizable(True, True)
+class _MultilineDialog:
+    """可复用的多行输入对话框：关闭时只隐藏窗口，下次调用直接复用控件。"""
+
+    def __init__(self) -> None:
+        self.top = tk.Toplevel()
+        self.top.withdraw()
+        self.top.transient()
+        self.top.resizable(True, True)
+
+        self.label = ttk.Label(self.top)
+        self.label.pack(padx=10, pady=8, anchor=tk.W)
+        self.text_widget = scrolledtext.ScrolledText(self.top, width=60, height=12, wrap=tk.WORD)
+        self.text_widget.pack(padx=10, pady=(0, 10), fill=tk.BOTH, expand=True)
 
-    ttk.Label(dialog, text=prompt).pack(padx=10, pady=8, anchor=tk.W)
-    text_widget = scrolledtext.ScrolledText(dialog, width=60, height=12, wrap=tk.WORD)
-    text_widget.pack(padx=10, pady=(0, 10), fill=tk.BOTH, expand=True)
-    if default:
-        text_widget.insert("1.0", default)
+        btn_frame = ttk.Frame(self.top)
+        btn_frame.pack(pady=(0, 10))
 
-    result: Dict[str, Optional[str]] = {"value": None}
+        ttk.Button(btn_frame, text="确定", width=10, command=self.on_ok).pack(side=tk.LEFT, padx=6)
+        ttk.Button(btn_frame, text="取消", width=10, command=self.on_cancel).pack(side=tk.LEFT, padx=6)
 
-    def on_ok() -> None:
-        result["value"] = text_widget.get("1.0", tk.END).strip()
-        dialog.destroy()
+        self.top.bind("<Return>", lambda _e: self.on_ok())
+        self.top.bind("<Escape>", lambda _e: self.on_cancel())
+        self.top.protocol("WM_DELETE_WINDOW", self.on_cancel)
 
-    def on_cancel() -> None:
-        dialog.destroy()
+        self.value: Optional[str] = None
+        self.done = tk.BooleanVar(self.top, value=False)
 
-    btn_frame = ttk.Frame(dialog)
-    btn_frame.pack(pady=(0, 10))
+    def ask(self, title: str, prompt: str, default: str) -> Optional[str]:
+        self.top.title(title)
+        self.label.configure(text=prompt)
+        self.text_widget.delete("1.0", tk.END)
+        if default:
+            self.text_widget.insert("1.0", default)
+        self.value = None
+        self.done.set(False)
+
+        self.top.deiconify()
+        self.top.grab_set()
+        self.text_widget.focus_set()
+        self.top.wait_variable(self.done)
+        return self.value
 
-    ttk.Button(btn_frame, text="确定", width=10, command=on_ok).pack(side=tk.LEFT, padx=6)
-    ttk.Button(btn_frame, text="取消", width=10, command=on_cancel).pack(side=tk.LEFT, padx=6)
+    def on_ok(self) -> None:
+        self.value = self.text_widget.get("1.0", tk.END).strip()
+        self._close()
 
-    dialog.bind("<Return>", lambda _e: on_ok())
-    dialog.bind("<Escape>", lambda _e: on_cancel())
+    def on_cancel(self) -> None:
+        self.value = None
+        self._close()
 
-    dialog.wait_window()
-    return result["value"]
+    def _close(self) -> None:
+        self.top.grab_release()
+        self.top.withdraw()
+        self.done.set(True)
+
+
+_multiline_dialog: Optional[_MultilineDialog] = None
+
+
+def multiline_input(title: str, prompt: str, default: str = "") -> Optional[str]:
+    global _multiline_dialog
+    if _multiline_dialog is None or not _multiline_dialog.top.winfo_exists():
+        _multiline_dialog = _MultilineDialog()
+    return _multiline_dialog.ask(title, prompt, default)
 
 
 def main() -> None:
@@ -987,7 +1625,13 @@ def main() -> None:
 
     def on_close() -> None:
         try:
-            app.save_data()
+            app.save_data(immediate=True)
+            # 不等待进行中的下载和写入，窗口立即关闭；未写完的棋谱可重新下载
+            app._download_pool.shutdown(wait=False, cancel_futures=True)
+            app._archive_pool.shutdown(wait=False, cancel_futures=True)
+            with app._archive_db_lock:
+                if app._archive_db is not None:
+                    app._archive_db.close()
         finally:
             root.destroy()
 
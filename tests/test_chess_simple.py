@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""chess_simple 中不依赖界面的解析逻辑测试。"""
+
+import random
+import re
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+try:
+    import chess_simple
+except ImportError:  # 运行环境缺少 requests 等依赖时跳过
+    chess_simple = None
+
+
+def _baseline_parse_students_list(content):
+    """优化前的逐行解析实现，作为行为基准。"""
+    students = {}
+    for line in content.strip().split('\n'):
+        line = line.strip()
+        if not line:
+            continue
+        line = re.sub(r'^\d+[\.\)]\s*', '', line)
+        if '->' in line:
+            parts = line.split('->')
+            if len(parts) == 2:
+                students[parts[0].strip()] = parts[1].strip()
+        else:
+            parts = line.split()
+            if len(parts) >= 2:
+                students[' '.join(parts[:-1])] = parts[-1]
+            elif len(parts) == 1:
+                students[parts[0]] = parts[0]
+    return students
+
+
+def _parse(content):
+    return chess_simple.ChessToolTabs.parse_students_list(None, content)
+
+
+@unittest.skipIf(chess_simple is None, "chess_simple 的依赖未安装")
+class ParseStudentsListTest(unittest.TestCase):
+    CASES = [
+        "Alice Wang -> user name",
+        "Bob   Li   bobli",
+        "Li\tMing  lm",
+        "名字 -> ",
+        "1.",
+        "a->b->c",
+        "2) 张三 zhangsan",
+        "3.李四->lisi",
+        "solo",
+        "  ",
+        "-> x",
+        # 全角空格、不换行空格与行尾回车也要和 split() 一样当作分隔符
+        "张三　zhangsan",
+        "Li\xa0Si  lisi\r",
+        "4.\u3000王五\xa0->\u3000wangwu",
+    ]
+
+    def test_matches_baseline_on_edge_cases(self):
+        for line in self.CASES:
+            with self.subTest(line=line):
+                self.assertEqual(_parse(line), _baseline_parse_students_list(line))
+        content = "\n".join(self.CASES)
+        self.assertEqual(_parse(content), _baseline_parse_students_list(content))
+
+    def test_matches_baseline_on_random_rosters(self):
+        rng = random.Random(0)
+        alphabet = ["a", "B", "张", "1", "2", ".", ")", "-", ">", "->", " ", "\t", "　", "\xa0", "\r"]
+        for _ in range(2000):
+            lines = ["".join(rng.choice(alphabet) for _ in range(rng.randint(0, 10))) for _ in range(rng.randint(1, 5))]
+            content = "\n".join(lines)
+            with self.subTest(content=content):
+                self.assertEqual(_parse(content), _baseline_parse_students_list(content))
+
+
+@unittest.skipIf(chess_simple is None, "chess_simple 的依赖未安装")
+class ExtractNamesTest(unittest.TestCase):
+    """chunk1-12: 常见分隔符先用 partition 切分，分隔符之后的内容整体作为黑方。"""
+
+    def _names(self, line):
+        return object.__new__(chess_simple.ChessToolTabs)._extract_names(line)
+
+    def test_multi_word_names_around_vs(self):
+        self.assertEqual(self._names("Li Xing vs Wang Fang"), ("Li Xing", "Wang Fang"))
+
+    def test_multi_word_black_after_dash(self):
+        self.assertEqual(self._names("A - Li Xing"), ("A", "Li Xing"))
+
+    def test_colon_separator(self):
+        self.assertEqual(self._names("张三：李四"), ("张三", "李四"))
+
+    def test_whitespace_fallback_still_used(self):
+        self.assertEqual(self._names("张三 李四"), ("张三", "李四"))
+
+    def test_digit_only_side_rejected(self):
+        self.assertIsNone(self._names("12"))
+
+
+if __name__ == "__main__":
+    unittest.main()
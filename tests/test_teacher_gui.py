@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+"""teacher_gui 中不依赖界面的逻辑测试。"""
+
+import random
+import re
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import teacher_gui  # noqa: E402
+
+
+def _make_app(students):
+    # 跳过 __init__，避免创建 Tk 窗口；find_username 只依赖学员索引
+    app = object.__new__(teacher_gui.TeacherChessApp)
+    app.students = dict(students)
+    app._rebuild_student_index()
+    return app
+
+
+def _linear_find_username(app, name):
+    """二分前缀查找引入前的逐个扫描实现，作为匹配优先级的基准。"""
+    if not name:
+        return "未找到"
+    name = name.strip()
+    if name in app.students:
+        return app.students[name]
+    lower = name.lower()
+    username = app._sx_exact.get(lower)
+    if username is not None:
+        return username
+    for real_lower, username in app._sx_lower:
+        if lower in real_lower:
+            return username
+    for real_lower, username in app._sx_lower:
+        if real_lower in lower:
+            return username
+    parts = lower.split()
+    first = parts[0] if parts else lower
+    if len(first) > 1:
+        username = app._sx_first.get(first)
+        if username is not None:
+            return username
+    hits = [app._sx_tokens[p] for p in parts if len(p) > 1 and p in app._sx_tokens]
+    if hits:
+        return app._sx_usernames[min(hits)]
+    clean = teacher_gui._NONWORD_RE.sub("", lower)
+    if clean:
+        return app._sx_clean.get(clean, "未找到")
+    return "未找到"
+
+# chunk2-13 之前逐行去序号所用的正则
+_OLD_LEADING_NUM_STUDENT = re.compile(r"^[\s\u3000]*\d+[\.、:：\)\-\s]*")
+_OLD_LEADING_NUM_PAIR = re.compile(r"^\s*\d+[\.、:：\)\-–—\s]*")
+
+
+def _per_line_parse_students_list(app, content):
+    """整段替换序号之前的逐行实现，作为 parse_students_list 的基准。"""
+    students = {}
+    for raw in content.splitlines():
+        line = raw.strip()
+        if not line:
+            continue
+        line = _OLD_LEADING_NUM_STUDENT.sub("", line)
+        line = line.strip()
+        for sep in ("->", "：", ":", "-", "—"):
+            if sep in line:
+                left, right = line.rsplit(sep, 1)
+                name = left.strip()
+                username = right.strip()
+                break
+        else:
+            items = line.split()
+            if len(items) >= 2:
+                name = " ".join(items[:-1]).strip()
+                username = items[-1].strip()
+            else:
+                continue
+        if name and username:
+            if any(sep in username for sep in (":", "：")):
+                parts = re.split(r"[:：]", username)
+                username_candidate = parts[-1].strip()
+                name_tail = " ".join(p.strip() for p in parts[:-1] if p.strip())
+                if username_candidate:
+                    username = username_candidate
+                    if name_tail:
+                        name = f"{name} {name_tail}".strip()
+            username = app.sanitize_username(username)
+            if not username:
+                continue
+            students[name] = username
+    return students
+
+
+def _per_line_parse_pairings_content(app, content):
+    """整段替换序号之前的逐行实现，作为 parse_pairings_content 的基准。"""
+    pairings = []
+    for raw in content.splitlines():
+        line = raw.strip()
+        if not line:
+            continue
+        line = _OLD_LEADING_NUM_PAIR.sub("", line)
+        line = line.strip()
+        if not line:
+            continue
+        pairing = app._extract_pairing(line)
+        if pairing:
+            pairings.append(pairing)
+    return pairings
+
+
+def _random_paste(rng):
+    pieces = ["1", "23", ".", "、", ")", "-", "–", "—", ":", "：", "->", " vs ", " 对 ",
+              " ", "\t", "\u3000", "\xa0", "\r", "\n", "\r\n", "\u2028", "\x0b",
+              "Li", "Xing", "张三", "abc_1"]
+    return "".join(rng.choice(pieces) for _ in range(rng.randint(0, 25)))
+
+
+class FindUsernameTest(unittest.TestCase):
+    def test_sorted_index_is_built_from_roster(self):
+        app = _make_app({"Kyle Zhang": "kyle_z", "Amy Li": "amy"})
+        self.assertEqual(app._sx_sorted_keys, ["amy li", "kyle zhang"])
+        self.assertEqual(app._sx_sorted, [("amy li", 1), ("kyle zhang", 0)])
+
+    def test_earlier_substring_match_beats_later_prefix_match(self):
+        app = _make_app({"Alice Kyleson": "alice_k", "Kyle Zhang": "kyle_z"})
+        self.assertEqual(app.find_username("kyle"), "alice_k")
+
+    def test_prefix_match_found_by_bisect(self):
+        app = _make_app({"Amy Li": "amy", "Kyle Zhang": "kyle_z", "Bo Kyle": "bo"})
+        self.assertEqual(app.find_username("kyle"), "kyle_z")
+
+    def test_lowest_roster_index_among_prefix_matches(self):
+        # 字母序靠前的 "kyle a" 在名单中排后，仍应返回名单中更早的 "kyle z"
+        app = _make_app({"Kyle Z": "kz", "Kyle A": "ka"})
+        self.assertEqual(app.find_username("kyle"), "kz")
+
+    def test_matches_linear_scan_on_random_rosters(self):
+        rng = random.Random(0)
+        alphabet = "abkyle "
+        for _ in range(500):
+            roster = {}
+            for i in range(rng.randint(1, 8)):
+                name = "".join(rng.choice(alphabet) for _ in range(rng.randint(1, 6))).strip() or "x"
+                roster[name] = f"user{i}"
+            app = _make_app(roster)
+            for _ in range(10):
+                query = "".join(rng.choice(alphabet) for _ in range(rng.randint(1, 4)))
+                with self.subTest(roster=roster, query=query):
+                    self.assertEqual(app.find_username(query), _linear_find_username(app, query))
+
+
+class WholeTextOrdinalStripTest(unittest.TestCase):
+    """chunk2-13: 整段一次去序号与逐行去序号结果一致。"""
+
+    def test_students_match_per_line_parsing(self):
+        app = _make_app({})
+        rng = random.Random(1)
+        for _ in range(3000):
+            content = _random_paste(rng)
+            with self.subTest(content=content):
+                self.assertEqual(app.parse_students_list(content), _per_line_parse_students_list(app, content))
+
+    def test_pairings_match_per_line_parsing(self):
+        app = _make_app({"Li Xing": "lixing"})
+        rng = random.Random(2)
+        for _ in range(3000):
+            content = _random_paste(rng)
+            with self.subTest(content=content):
+                self.assertEqual(
+                    app.parse_pairings_content(content), _per_line_parse_pairings_content(app, content)
+                )
+
+    def test_ordinal_does_not_cross_lines(self):
+        app = _make_app({})
+        self.assertEqual(app.parse_students_list("1.\n2 张三 zhangsan"), {"张三": "zhangsan"})
+
+
+class PairingSplitTest(unittest.TestCase):
+    """chunk2-11: 常见分隔符用 partition 切分，保留两侧的完整姓名。"""
+
+    def _names(self, line):
+        pairing = _make_app({})._extract_pairing(line)
+        return pairing["white"], pairing["black"]
+
+    def test_multi_word_names_around_vs(self):
+        self.assertEqual(self._names("Li Xing vs Wang Fang"), ("Li Xing", "Wang Fang"))
+
+    def test_multi_word_black_after_dash(self):
+        self.assertEqual(self._names("A - Li Xing"), ("A", "Li Xing"))
+
+    def test_chinese_separator(self):
+        self.assertEqual(self._names("张三 对 李四"), ("张三", "李四"))
+
+    def test_whitespace_fallback_still_used(self):
+        self.assertEqual(self._names("张三 李四"), ("张三", "李四"))
+
+
+if __name__ == "__main__":
+    unittest.main()